@@ -0,0 +1,108 @@
+"""
+Worker start-up time: importing server and serving the first request
+
+Every run is a fresh interpreter (a new uvicorn/gunicorn worker), timed
+from just before `import server` to the end of the first /api/test
+response, driven in-process over ASGI. MongoDB connect and the startup
+hooks are left out: they are network-bound and run before the worker
+accepts traffic either way. Fails when the median regresses past the
+budget, or when the first request has already imported a subsystem that
+should only load on first use (Stripe SDK, pandas/numpy, boto3).
+
+    python benchmarks/startup_time.py --runs 7 --budget-ms 600
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median import + first request: 470-540 ms here, ~220 ms of it importing FastAPI and
+# pydantic; importing Stripe and pandas/numpy eagerly would add another ~400 ms
+STARTUP_BUDGET_MS = 600
+LAZY_MODULES = ("stripe", "pandas", "numpy", "boto3", "services.analytics")
+
+# Prefixes the probe's result line: the server's own logging also goes to stdout, from a
+# background QueueListener thread, so line order is not guaranteed
+RESULT_MARKER = "STARTUP_RESULT"
+
+PROBE = """
+import asyncio, json, sys, time
+RESULT_MARKER = %r
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+
+async def first_request():
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/test",
+        "raw_path": b"/api/test",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80)
+    }
+    await server.app(scope, receive, send)
+    return messages[0]["status"]
+
+status = asyncio.run(first_request())
+done = time.perf_counter()
+print(RESULT_MARKER, json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "total_ms": (done - started) * 1000,
+    "status": status,
+    "loaded": [name for name in %r if name in sys.modules]
+}), flush=True)
+""" % (RESULT_MARKER, LAZY_MODULES)
+
+def measure() -> dict:
+    # Startup warnings (e.g. no frontend build) would only be noise here
+    env = dict(os.environ, LOG_LEVEL="ERROR")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_MARKER + " "):
+            return json.loads(line[len(RESULT_MARKER) + 1:])
+    raise RuntimeError(f"startup probe printed no {RESULT_MARKER} line:\n{result.stdout}{result.stderr}")
+
+def main(runs: int, budget_ms: float) -> bool:
+    # One discarded run writes .pyc files and warms the OS page cache, as on a deployed worker
+    measure()
+    samples = [measure() for _ in range(runs)]
+
+    import_ms = statistics.median(sample["import_ms"] for sample in samples)
+    total_ms = statistics.median(sample["total_ms"] for sample in samples)
+    eager = sorted({name for sample in samples for name in sample["loaded"]})
+    failed = [sample["status"] for sample in samples if sample["status"] != 200]
+
+    print(f"import server:       {import_ms:8.1f} ms (median of {runs})")
+    print(f"to first response:   {total_ms:8.1f} ms (budget {budget_ms:.0f} ms)")
+    print(f"loaded too early:    {', '.join(eager) or 'none'}")
+    if failed:
+        print(f"first request failed with status {failed[0]}")
+    return total_ms <= budget_ms and not eager and not failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+    sys.exit(0 if main(args.runs, args.budget_ms) else 1)
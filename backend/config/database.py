@@ -17,19 +17,16 @@ weddings_collection = None
 rsvp_collection = None
 guestbook_collection = None
 
-async def connect_to_mongo():
-    """Connect to MongoDB database"""
+async def connect_to_mongo(event_listeners=None):
+    """Connect to MongoDB database (event_listeners: pymongo monitoring listeners)"""
     global mongodb_client, database
     try:
-        print(f"🔄 Attempting to connect to MongoDB: {settings.MONGO_URL}")
-        mongodb_client = AsyncIOMotorClient(settings.MONGO_URL)
+        mongodb_client = AsyncIOMotorClient(settings.MONGO_URL, event_listeners=event_listeners or [])
         database = mongodb_client[settings.DB_NAME]
         # Test the connection
         await database.command("ping")
-        print(f"✅ Connected to MongoDB database: {settings.DB_NAME}")
         logger.info(f"✅ Connected to MongoDB database: {settings.DB_NAME}")
     except Exception as e:
-        print(f"❌ Error connecting to MongoDB: {e}")
         logger.error(f"❌ Error connecting to MongoDB: {e}")
         # Don't raise the error, just continue with JSON files
         pass
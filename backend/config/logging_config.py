@@ -0,0 +1,175 @@
+"""
+Structured, non-blocking logging
+
+Every record is handed to a QueueHandler (a cheap in-memory put) and a
+QueueListener thread does the formatting and stream I/O, so logging never
+blocks the event loop. Records carry the current request id, are emitted
+as one JSON object per line (or plain text with LOG_FORMAT=text), and can be
+tuned per logger:
+
+    LOG_LEVEL=INFO
+    LOG_LEVELS=server.sessions=DEBUG,pymongo=WARNING
+    LOG_SAMPLE=server.sessions=0.1        # keep ~10% of sub-WARNING records
+
+Only API requests are access-logged (logger "server.access"); static files
+and the React app shell are never logged per hit.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+DEFAULT_LEVELS = {
+    # uvicorn's access log would log every static-file hit
+    "uvicorn.access": "WARNING",
+    "pymongo": "WARNING",
+    "motor": "WARNING"
+}
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+def _parse_mapping(value: str) -> dict:
+    mapping = {}
+    for item in (value or "").split(","):
+        name, _, setting = item.partition("=")
+        if name.strip() and setting.strip():
+            mapping[name.strip()] = setting.strip()
+    return mapping
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the request id of the task that logged them"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of sub-WARNING records from high-volume loggers"""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        name = record.name
+        while name:
+            rate = self.rates.get(name)
+            if rate is not None:
+                return random.random() < rate
+            name = name.rpartition(".")[0]
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.request_id:
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def configure_logging():
+    """Route all logging through a background QueueListener (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"))
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    rates = {name: float(rate) for name, rate in _parse_mapping(os.getenv("LOG_SAMPLE")).items()}
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    # Handler filters run in the caller's thread, where the request context is visible
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    # Send uvicorn's loggers through the queue as well
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    levels = {**DEFAULT_LEVELS, **_parse_mapping(os.getenv("LOG_LEVELS"))}
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+class RequestIdMiddleware:
+    """Assign each HTTP request an id (honoring X-Request-ID) and access-log API calls"""
+
+    def __init__(self, app, access_prefix: str = "/api"):
+        self.app = app
+        self.access_prefix = access_prefix
+        self.logger = logging.getLogger("server.access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if scope["path"].startswith(self.access_prefix) and self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    f"{scope['method']} {scope['path']} {status_code}",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+                    }
+                )
+            request_id_var.reset(token)
@@ -20,6 +20,11 @@ class Settings:
     # Stripe Configuration
     STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
+    STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+    
+    # Public origin of the site (e.g. https://cards.example.com); absolute links in
+    # rendered pages use it instead of the client-supplied Host header
+    PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/") or None
     
     # CORS Configuration
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -0,0 +1,54 @@
+"""
+Maintenance commands for the Wedding Card backend
+
+Usage (from the backend directory):
+    python manage.py rebuild-rsvp-summary [WEDDING_ID]
+    python manage.py reconcile-contribution-totals [WEDDING_ID]
+    python manage.py normalize-contribution-dates
+"""
+import asyncio
+from typing import Optional
+
+import typer
+
+import server
+
+cli = typer.Typer(help="Wedding Card maintenance commands")
+
+async def _with_database(coro_factory):
+    await server.connect_to_mongo()
+    try:
+        return await coro_factory()
+    finally:
+        await server.close_mongo_connection()
+
+@cli.command("rebuild-rsvp-summary")
+def rebuild_rsvp_summary(wedding_id: Optional[str] = typer.Argument(None, help="Rebuild one wedding; omit for all")):
+    """Recompute RSVP summary counters from the raw rsvps collection"""
+    async def run():
+        if wedding_id:
+            wedding_ids = [wedding_id]
+        else:
+            wedding_ids = await server.database.rsvps.distinct("wedding_id")
+        for current_id in wedding_ids:
+            summary = await server.rebuild_rsvp_summary(current_id)
+            typer.echo(f"{current_id}: {summary['total_responses']} responses, {summary['attending_guests']} attending guests")
+        return len(wedding_ids)
+
+    count = asyncio.run(_with_database(run))
+    typer.echo(f"Rebuilt {count} RSVP summaries")
+
+@cli.command("reconcile-contribution-totals")
+def reconcile_contribution_totals(wedding_id: Optional[str] = typer.Argument(None, help="Reconcile one wedding; omit for all")):
+    """Recompute per-currency contribution totals from completed contributions"""
+    count = asyncio.run(_with_database(lambda: server.reconcile_contribution_totals(wedding_id)))
+    typer.echo(f"Reconciled contribution totals for {count} weddings")
+
+@cli.command("normalize-contribution-dates")
+def normalize_contribution_dates():
+    """Store every contribution created_at as a datetime so the ledger sorts and filters correctly"""
+    count = asyncio.run(_with_database(server.normalize_contribution_dates))
+    typer.echo(f"Normalized created_at on {count} contributions")
+
+if __name__ == "__main__":
+    cli()
@@ -1,66 +1,100 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from dotenv import load_dotenv
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 import os
 import logging
-from pathlib import Path
-from pydantic import BaseModel, Field
 from typing import List, Optional
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import json
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 import asyncio
-import stripe
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+import hmac
+import time
+from config import database as mongo
+from config.logging_config import RequestIdMiddleware, configure_logging
+from config.settings import settings
+from models.guestbook import GuestbookMessage
+from models.payment import HoneymoonFundConfig, PaymentContribution, PaymentRequest
+from models.rsvp import RSVPResponse
+from models.user import AuthResponse, User, UserLogin, UserRegister
+from models.wedding import WeddingData, WeddingDataCreate
+from services import exports
+from services.compression import CompressionMiddleware, CompressionStats
+from services.events import EventBroker
+from services.identity import WeddingDirectory
+from services.idempotency import IdempotencyConflict, IdempotencyError, IdempotencyInProgress, IdempotencyStore, fingerprint
+from services.metrics import (
+    Counter, EventLoopLagMonitor, Gauge, InstrumentedRoute, MetricsMiddleware, MongoCommandMetrics, registry as metrics_registry,
+    snapshot_gauges
+)
+from services.payments import PaymentGatewayError, StripeGateway, parse_webhook_event
+from services.profiling import MAX_CPU_SECONDS, CpuSampler, MemoryProfiler, ProfilerBusy
+from services.public_feed import PublicFeed
+from services.reconciler import PendingContributionSweeper
+from services.search import SearchIndexRegistry
+from services.sections import (
+    SECTION_FIELDS, VERSIONS_FIELD, SectionCache, SectionPayload, build_section_payload, section_projection, section_version,
+    section_version_bump, sections_touched
+)
+from services.share_pages import SharePage, SharePageCache, render_share_page
+from services.static_assets import StaticManifest, negotiated_response
+from services.tracing import MongoTracingListener, TracedJSONResponse, TracingMiddleware, exporter_from_env, span
+from services.watchdog import LoopWatchdogMiddleware, watchdog_from_env
+from utils.file_operations import load_json_file, save_json_file
+from utils.lazy import LazyModule
+from utils.pagination import decode_cursor, encode_cursor, keyset_filter
+from utils.session import active_sessions, create_simple_session, get_current_user_simple
+
+# config.settings loads .env
+ROOT_DIR = settings.ROOT_DIR
 
-# MongoDB connection
-MONGO_URL = os.getenv("MONGO_URL")
-DB_NAME = os.getenv("DB_NAME", "weddingcard")
+# Configure logging
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Stripe configuration
-STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
-STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
-stripe.api_key = STRIPE_SECRET_KEY
+STRIPE_PUBLISHABLE_KEY = settings.STRIPE_PUBLISHABLE_KEY
+STRIPE_SECRET_KEY = settings.STRIPE_SECRET_KEY
+STRIPE_WEBHOOK_SECRET = settings.STRIPE_WEBHOOK_SECRET
+
+# Stripe calls run on a bounded thread pool, never on the event loop; the
+# SDK itself is imported by the first payment call
+payment_gateway = StripeGateway(
+    STRIPE_SECRET_KEY,
+    api_base=os.getenv("STRIPE_API_BASE"),
+    max_workers=int(os.getenv("STRIPE_MAX_WORKERS", "8")),
+    timeout=float(os.getenv("STRIPE_TIMEOUT_SECONDS", "10")),
+    max_retries=int(os.getenv("STRIPE_MAX_RETRIES", "2"))
+)
+
+# Operator access for fleet-wide/admin endpoints (disabled when unset)
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+# Pandas/numpy reporting; imported by the first analytics request, not at startup
+analytics = LazyModule("services.analytics")
 
-# MongoDB client and database
+# MongoDB client and database (shared with utils.session through config.database)
+mongo_command_metrics = MongoCommandMetrics()
+mongo_tracing_listener = MongoTracingListener()
 mongodb_client = None
 database = None
 
 async def connect_to_mongo():
     global mongodb_client, database
-    try:
-        print(f"🔄 Attempting to connect to MongoDB: {MONGO_URL}")
-        mongodb_client = AsyncIOMotorClient(MONGO_URL)
-        database = mongodb_client[DB_NAME]
-        # Test the connection
-        await database.command("ping")
-        print(f"✅ Connected to MongoDB database: {DB_NAME}")
-        logger.info(f"✅ Connected to MongoDB database: {DB_NAME}")
-    except Exception as e:
-        print(f"❌ Error connecting to MongoDB: {e}")
-        logger.error(f"❌ Error connecting to MongoDB: {e}")
-        # Don't raise the error, just continue with JSON files
-        pass
+    await mongo.connect_to_mongo(event_listeners=[mongo_command_metrics, mongo_tracing_listener])
+    mongodb_client, database = mongo.mongodb_client, mongo.database
 
 async def close_mongo_connection():
-    global mongodb_client
-    if mongodb_client:
-        mongodb_client.close()
+    await mongo.close_mongo_connection()
 
 # JSON file for simple user storage (backup)
 USERS_FILE = ROOT_DIR / 'users.json'
 WEDDINGS_FILE = ROOT_DIR / 'weddings.json'
 
-# Create the main app without a prefix
-app = FastAPI()
-
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=InstrumentedRoute)
 
 # MongoDB collections
 users_collection = None
@@ -69,199 +103,81 @@ weddings_collection = None
 async def get_collections():
     global users_collection, weddings_collection
     if users_collection is None:
-        users_collection = database.users
-    if weddings_collection is None:
-        weddings_collection = database.weddings
+        users_collection, weddings_collection, _, _ = await mongo.get_collections()
     return users_collection, weddings_collection
 
-# Simple session storage (in production, use Redis or similar)
-active_sessions = {}
-
-# Models
-class UserRegister(BaseModel):
-    username: str
-    password: str
-
-class UserLogin(BaseModel):
-    username: str
-    password: str
-
-class User(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    username: str
-    password: str  # Simple plain text password
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-
-class RSVPResponse(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    wedding_id: str
-    guest_name: str
-    guest_email: str
-    guest_phone: Optional[str] = ""
-    attendance: str  # "yes" or "no"
-    guest_count: int = 1
-    dietary_restrictions: Optional[str] = ""
-    special_message: Optional[str] = ""
-    submitted_at: datetime = Field(default_factory=datetime.utcnow)
-
-class WeddingData(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    user_id: str
-    couple_name_1: str
-    couple_name_2: str
-    wedding_date: str
-    venue_name: str
-    venue_location: str
-    their_story: str
-    story_timeline: List[dict] = []
-    schedule_events: List[dict] = []
-    gallery_photos: List[dict] = []
-    bridal_party: List[dict] = []
-    groom_party: List[dict] = []
-    special_roles: List[dict] = []  # Added special roles field
-    registry_items: List[dict] = []
-    honeymoon_fund: dict = {}
-    faqs: List[dict] = []
-    theme: str = "classic"
-    rsvp_responses: List[dict] = []  # Store RSVP responses
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-
-class WeddingDataCreate(BaseModel):
-    couple_name_1: str
-    couple_name_2: str
-    wedding_date: str
-    venue_name: str
-    venue_location: str
-    their_story: str
-    story_timeline: List[dict] = []
-    schedule_events: List[dict] = []
-    gallery_photos: List[dict] = []
-    bridal_party: List[dict] = []
-    groom_party: List[dict] = []
-    special_roles: List[dict] = []  # Added special roles field
-    registry_items: List[dict] = []
-    honeymoon_fund: dict = {}
-    faqs: List[dict] = []
-    theme: str = "classic"
-
-class AuthResponse(BaseModel):
-    session_id: str
-    user_id: str
-    username: str
-    success: bool
-
-# Registry/Payment Models
-class HoneymoonFundConfig(BaseModel):
-    upi_id: Optional[str] = ""
-    phone_number: Optional[str] = ""
-    destination: str = "Tokyo & Kyoto, Japan"
-    description: str = "Help us create unforgettable memories on our honeymoon to Japan. Every contribution, big or small, means the world to us!"
-    image_url: str = "https://images.unsplash.com/photo-1545569341-9eb8b30979d9?w=800&h=400&fit=crop"
-    is_active: bool = True
-
-class PaymentContribution(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    wedding_id: str
-    contributor_name: str
-    contributor_email: Optional[str] = ""
-    contributor_phone: Optional[str] = ""
-    amount: float  # Amount in currency units (e.g., rupees, dollars)
-    currency: str = "inr"  # Currency code
-    stripe_payment_intent_id: str
-    stripe_session_id: Optional[str] = ""
-    payment_status: str = "pending"  # pending, completed, failed
-    message: Optional[str] = ""
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-
-class PaymentRequest(BaseModel):
-    wedding_id: str
-    contributor_name: str
-    contributor_email: Optional[str] = ""
-    contributor_phone: Optional[str] = ""
-    amount: float
-    currency: str = "inr"
-    message: Optional[str] = ""
-
-# Simple file operations
-def load_json_file(filename):
-    if not filename.exists():
-        return {}
-    try:
-        with open(filename, 'r') as f:
-            return json.load(f)
-    except:
-        return {}
-
-def save_json_file(filename, data):
-    with open(filename, 'w') as f:
-        json.dump(data, f, indent=2, default=str)
-
-# MongoDB-based authentication helper functions
-async def create_simple_session(user_id: str) -> str:
-    session_id = str(uuid.uuid4())
-    session_data = {
-        "session_id": session_id,
-        "user_id": user_id,
-        "created_at": datetime.utcnow()
-    }
-    
-    # Store in memory for fast access
-    active_sessions[session_id] = session_data
-    
-    # Also store in MongoDB for persistence across server restarts
-    users_coll, weddings_coll = await get_collections()
-    if users_coll is not None:
-        try:
-            sessions_collection = database.sessions
-            await sessions_collection.insert_one(session_data)
-            print(f"✅ Session {session_id} stored in MongoDB")
-        except Exception as e:
-            print(f"⚠️ Failed to store session in MongoDB: {e}")
-    
-    return session_id
+def require_admin(admin_token: Optional[str]):
+    """Reject requests that do not carry the configured admin token"""
+    if not ADMIN_API_TOKEN or not admin_token or not hmac.compare_digest(admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+# Data versions - bumped on every write that changes report inputs
+async def bump_data_version(kind: str, wedding_id: str):
+    """Advance the per-wedding and fleet-wide version counters for a data kind"""
+    await asyncio.gather(
+        database.data_versions.update_one({"_id": f"{kind}:{wedding_id}"}, {"$inc": {"v": 1}}, upsert=True),
+        database.data_versions.update_one({"_id": f"{kind}:*"}, {"$inc": {"v": 1}}, upsert=True)
+    )
+
+async def get_data_versions(*keys: str) -> tuple:
+    """Read version counters for the given keys (missing keys are version 0)"""
+    found = {}
+    async for doc in database.data_versions.find({"_id": {"$in": list(keys)}}):
+        found[doc["_id"]] = doc.get("v", 0)
+    return tuple(found.get(key, 0) for key in keys)
+
+# {id, user_id, shareable_id, updated_at} lookups for handlers that don't need content
+wedding_directory = WeddingDirectory(
+    max_entries=int(os.getenv("WEDDING_DIRECTORY_SIZE", "5000")),
+    ttl=float(os.getenv("WEDDING_DIRECTORY_TTL_SECONDS", "30"))
+)
 
-async def get_current_user_simple(session_id: str = None):
+def wedding_update(fields: dict, changed_fields=None) -> dict:
+    """Update document that sets fields and bumps the versions of the sections they belong to"""
+    update = {"$set": fields}
+    bump = section_version_bump(fields if changed_fields is None else changed_fields)
+    if bump:
+        update["$inc"] = bump
+    return update
+
+def invalidate_wedding_caches(wedding_id: str, fields):
+    """Drop this worker's cached renderings of a wedding after its fields changed"""
+    share_pages.invalidate(wedding_id)
+    wedding_directory.invalidate(wedding_id)
+    section_cache.invalidate(wedding_id, sections_touched(fields))
+
+async def require_wedding_owner(wedding_id: str, session_id: str) -> str:
+    """Return wedding_id if the session's user owns it, otherwise raise 401/403"""
     if not session_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Session ID required"
         )
     
-    # First check in-memory sessions
-    session = active_sessions.get(session_id)
-    
-    # If not in memory, check MongoDB
-    if not session:
-        try:
-            users_coll, weddings_coll = await get_collections()
-            if users_coll is not None:
-                sessions_collection = database.sessions
-                session_data = await sessions_collection.find_one({"session_id": session_id})
-                if session_data:
-                    # Restore to memory cache
-                    active_sessions[session_id] = session_data
-                    session = session_data
-                    print(f"✅ Session {session_id} restored from MongoDB")
-        except Exception as e:
-            print(f"⚠️ Failed to restore session from MongoDB: {e}")
-    
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid session"
-        )
-    
-    users_coll, weddings_coll = await get_collections()
-    user_data = await users_coll.find_one({"id": session["user_id"]})
+    current_user = await get_current_user_simple(session_id)
     
-    if not user_data:
+    wedding = await wedding_directory.by_id(wedding_id)
+    if not wedding or wedding.get("user_id") != current_user.id:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this wedding"
         )
-    
-    return User(**user_data)
+    return wedding["id"]
+
+# Live update notifications (Server-Sent Events), one topic per wedding id
+event_broker = EventBroker(
+    max_queue=int(os.getenv("EVENTS_QUEUE_SIZE", "64")),
+    heartbeat_interval=float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+)
+
+# Per-wedding search indexes over guestbook messages and RSVP notes
+search_indexes = SearchIndexRegistry(
+    max_weddings=int(os.getenv("SEARCH_MAX_WEDDINGS", "200")),
+    refresh_interval=float(os.getenv("SEARCH_REFRESH_SECONDS", "2"))
+)
 
 # Auth Routes - MongoDB-based
 @api_router.post("/auth/register", response_model=AuthResponse)
@@ -450,8 +366,8 @@ async def update_wedding_data(request_data: dict):
             detail="Wedding data not found"
         )
     
-    # Remove session_id from the data before updating
-    updated_data = {k: v for k, v in request_data.items() if k != 'session_id'}
+    # Remove session_id (and the server-maintained section versions) before updating
+    updated_data = {k: v for k, v in request_data.items() if k not in ('session_id', VERSIONS_FIELD)}
     updated_data["updated_at"] = datetime.utcnow().isoformat()
     updated_data["user_id"] = current_user.id
     updated_data["id"] = existing_wedding["id"]
@@ -464,11 +380,15 @@ async def update_wedding_data(request_data: dict):
     if "created_at" in existing_wedding:
         updated_data["created_at"] = existing_wedding["created_at"]
     
+    # The client sends the whole document; only fields that differ invalidate sections
+    changed_fields = [k for k, v in updated_data.items() if existing_wedding.get(k) != v]
+    
     # Update in MongoDB
     await weddings_coll.update_one(
         {"user_id": current_user.id},
-        {"$set": updated_data}
+        wedding_update(updated_data, changed_fields)
     )
+    invalidate_wedding_caches(existing_wedding["id"], changed_fields)
     
     # Also update JSON backup
     weddings = load_json_file(WEDDINGS_FILE)
@@ -560,33 +480,59 @@ async def get_wedding_by_username(username: str):
     public_data = {k: v for k, v in wedding.items() if k not in ["user_id", "_id"]}
     return public_data
 
+# Section pages, cached per (username, section) and invalidated per section
+section_cache = SectionCache(
+    max_entries=int(os.getenv("SECTION_CACHE_SIZE", "2000")),
+    revalidate_interval=float(os.getenv("SECTION_CACHE_REVALIDATE_SECONDS", "5"))
+)
+
 @api_router.get("/wedding/user/{username}/{section}")
-async def get_wedding_section_by_username(username: str, section: str):
-    """Get specific section data by username for section-based URLs"""
-    users_coll, weddings_coll = await get_collections()
-    
-    # Find user by username
-    user = await users_coll.find_one({"username": username})
-    if not user:
+async def get_wedding_section_by_username(username: str, section: str, request: Request):
+    """Get only the fields a section page renders, by username, with a per-section ETag"""
+    if section not in SECTION_FIELDS:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            detail=f"Unknown section: {section}"
         )
+    users_coll, weddings_coll = await get_collections()
     
-    # Get user's wedding data
-    wedding = await weddings_coll.find_one({"user_id": user["id"]})
-    if not wedding:
-        # Return default wedding data if user hasn't customized yet
-        wedding = get_default_wedding_data()
-    
-    # Remove sensitive data
-    public_data = {k: v for k, v in wedding.items() if k not in ["user_id", "_id"]}
-    
-    # Add section metadata
-    public_data["current_section"] = section
-    public_data["username"] = username
+    entry = section_cache.get(username, section)
+    if entry is not None and section_cache.needs_revalidation(entry):
+        # Pick up writes made by other workers to this section only
+        current = await weddings_coll.find_one({"id": entry.wedding_id}, {"_id": 0, f"{VERSIONS_FIELD}.{section}": 1})
+        if current is not None and section_version(current, section) == entry.version:
+            entry.checked_at = time.monotonic()
+        else:
+            entry = None
     
-    return public_data
+    if entry is None:
+        section_cache.misses += 1
+        # Find user by username
+        user = await users_coll.find_one({"username": username}, {"_id": 0, "id": 1})
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        
+        wedding = await weddings_coll.find_one({"user_id": user["id"]}, section_projection(section))
+        if not wedding:
+            # Default data until the user customizes their card (not cached)
+            return Response(content=build_section_payload(get_default_wedding_data(), section, username), media_type="application/json")
+        
+        # Precompressing a gallery full of inline images is CPU-heavy; keep it off the event loop
+        entry = await asyncio.to_thread(
+            SectionPayload, wedding["id"], section_version(wedding, section), build_section_payload(wedding, section, username)
+        )
+        section_cache.put(username, section, entry)
+    else:
+        section_cache.hits += 1
+    
+    return negotiated_response(
+        entry.body, entry.variants, entry.etag, "application/json", "no-cache",
+        accept_encoding=request.headers.get("accept-encoding", ""),
+        if_none_match=request.headers.get("if-none-match", "")
+    )
 
 def get_default_wedding_data():
     """Return default wedding card data"""
@@ -812,8 +758,112 @@ async def submit_rsvp(rsvp_data: dict):
     rsvps_collection = database.rsvps
     await rsvps_collection.insert_one(rsvp_dict)
     
+    await apply_rsvp_to_summary(rsvp_dict)
+    await bump_data_version("rsvps", rsvp_dict["wedding_id"])
+    event_broker.publish(rsvp_dict["wedding_id"], "rsvp.created", {"id": rsvp_response.id})
+    search_indexes.add_rsvp(rsvp_dict)
+    
     return {"success": True, "message": "RSVP submitted successfully", "rsvp_id": rsvp_response.id}
 
+# RSVP summary counters - one document per wedding, kept in step with the rsvps collection
+def dietary_bucket(dietary_restrictions) -> str:
+    """Normalize a free-text dietary restriction into a summary bucket key"""
+    bucket = " ".join(str(dietary_restrictions or "").lower().split())
+    if not bucket:
+        return "none"
+    # Field names cannot contain dots or start with "$"
+    return bucket.replace(".", "_").replace("$", "_")[:64]
+
+def rsvp_summary_delta(rsvp: dict, sign: int = 1) -> dict:
+    """Build the $inc document that adds (sign=1) or removes (sign=-1) one RSVP"""
+    guest_count = 1 if rsvp.get("guest_count") is None else int(rsvp["guest_count"])
+    delta = {
+        "total_responses": sign,
+        "total_guests": sign * guest_count,
+    }
+    if rsvp.get("attendance") == "yes":
+        delta["attending_count"] = sign
+        delta["attending_guests"] = sign * guest_count
+        delta[f"dietary.{dietary_bucket(rsvp.get('dietary_restrictions'))}"] = sign
+    elif rsvp.get("attendance") == "no":
+        delta["declined_count"] = sign
+    return delta
+
+async def apply_rsvp_to_summary(rsvp: dict, previous: dict = None):
+    """Atomically fold an inserted (or replaced, when previous is given) RSVP into the summary"""
+    delta = rsvp_summary_delta(rsvp)
+    if previous:
+        for key, value in rsvp_summary_delta(previous, sign=-1).items():
+            delta[key] = delta.get(key, 0) + value
+    
+    await database.rsvp_summaries.update_one(
+        {"wedding_id": rsvp["wedding_id"]},
+        {
+            "$inc": delta,
+            "$set": {"updated_at": datetime.utcnow().isoformat()}
+        },
+        upsert=True
+    )
+
+async def rebuild_rsvp_summary(wedding_id: str) -> dict:
+    """Recompute a wedding's RSVP summary from the raw rsvps collection"""
+    pipeline = [
+        {"$match": {"wedding_id": wedding_id}},
+        {"$group": {
+            "_id": {"attendance": "$attendance", "dietary": "$dietary_restrictions"},
+            "responses": {"$sum": 1},
+            "guests": {"$sum": {"$ifNull": ["$guest_count", 1]}}
+        }}
+    ]
+    summary = {
+        "wedding_id": wedding_id,
+        "total_responses": 0,
+        "total_guests": 0,
+        "attending_count": 0,
+        "attending_guests": 0,
+        "declined_count": 0,
+        "dietary": {},
+        "updated_at": datetime.utcnow().isoformat()
+    }
+    async for group in database.rsvps.aggregate(pipeline):
+        summary["total_responses"] += group["responses"]
+        summary["total_guests"] += group["guests"]
+        if group["_id"].get("attendance") == "yes":
+            summary["attending_count"] += group["responses"]
+            summary["attending_guests"] += group["guests"]
+            bucket = dietary_bucket(group["_id"].get("dietary"))
+            summary["dietary"][bucket] = summary["dietary"].get(bucket, 0) + group["responses"]
+        elif group["_id"].get("attendance") == "no":
+            summary["declined_count"] += group["responses"]
+    
+    await database.rsvp_summaries.replace_one({"wedding_id": wedding_id}, summary, upsert=True)
+    return summary
+
+@api_router.get("/rsvp/summary/{wedding_id}")
+async def get_rsvp_summary(wedding_id: str):
+    """Get precomputed RSVP counts for a wedding (single point read)"""
+    summary = await database.rsvp_summaries.find_one({"wedding_id": wedding_id}, {"_id": 0})
+    if not summary:
+        summary = {
+            "wedding_id": wedding_id,
+            "total_responses": 0,
+            "total_guests": 0,
+            "attending_count": 0,
+            "attending_guests": 0,
+            "declined_count": 0,
+            "dietary": {}
+        }
+    
+    return {"success": True, "summary": summary}
+
+@api_router.post("/rsvp/summary/{wedding_id}/rebuild")
+async def rebuild_rsvp_summary_endpoint(wedding_id: str, session_id: str = None):
+    """Recompute the RSVP summary from raw RSVPs (wedding owner only)"""
+    wedding_id = await require_wedding_owner(wedding_id, session_id)
+    
+    summary = await rebuild_rsvp_summary(wedding_id)
+    return {"success": True, "summary": summary}
+
 @api_router.get("/rsvp/{wedding_id}")
 async def get_wedding_rsvps(wedding_id: str):
     """Get all RSVPs for a specific wedding (for admin/couple view)"""
@@ -834,10 +884,8 @@ async def get_wedding_rsvps(wedding_id: str):
 @api_router.get("/rsvp/shareable/{shareable_id}")  
 async def get_rsvps_by_shareable_id(shareable_id: str):
     """Get RSVPs using shareable ID (for dashboard admin view)"""
-    users_coll, weddings_coll = await get_collections()
-    
-    # First find the wedding by shareable_id
-    wedding = await weddings_coll.find_one({"shareable_id": shareable_id})
+    # First resolve the shareable_id to the wedding id
+    wedding = await wedding_directory.by_shareable_id(shareable_id)
     
     if not wedding:
         raise HTTPException(
@@ -857,15 +905,87 @@ async def get_rsvps_by_shareable_id(shareable_id: str):
     
     return {"success": True, "rsvps": response_data, "total_count": len(response_data)}
 
-# Guestbook Models
-class GuestbookMessage(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    wedding_id: str
-    name: str
-    relationship: Optional[str] = ""
-    message: str
-    is_public: bool = True  # True for public landing page, False for private dashboard
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+# CSV exports - streamed straight from the cursor, never materialized
+RSVP_EXPORT_COLUMNS = [
+    "guest_name", "guest_email", "guest_phone", "attendance", "guest_count",
+    "dietary_restrictions", "special_message", "submitted_at"
+]
+GUESTBOOK_EXPORT_COLUMNS = ["name", "relationship", "message", "is_public", "created_at"]
+
+def csv_export_response(request: Request, cursor, columns: list, filename: str) -> StreamingResponse:
+    """Wrap a cursor in a (gzip-when-accepted) streaming CSV download"""
+    compress = exports.accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store"
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(
+        exports.stream_csv(cursor, columns, compress=compress),
+        media_type="text/csv; charset=utf-8",
+        headers=headers
+    )
+
+@api_router.get("/rsvp/{wedding_id}/export.csv")
+async def export_rsvps_csv(wedding_id: str, request: Request, session_id: str = None):
+    """Download a wedding's guest list as CSV (owner only)"""
+    wedding_id = await require_wedding_owner(wedding_id, session_id)
+    
+    projection = {column: 1 for column in RSVP_EXPORT_COLUMNS}
+    projection["_id"] = 0
+    cursor = database.rsvps.find({"wedding_id": wedding_id}, projection).sort("submitted_at", 1)
+    return csv_export_response(request, cursor, RSVP_EXPORT_COLUMNS, f"rsvps-{wedding_id}.csv")
+
+@api_router.get("/guestbook/{wedding_id}/export.csv")
+async def export_guestbook_csv(wedding_id: str, request: Request, session_id: str = None):
+    """Download a wedding's guestbook messages as CSV (owner only)"""
+    wedding_id = await require_wedding_owner(wedding_id, session_id)
+    
+    projection = {column: 1 for column in GUESTBOOK_EXPORT_COLUMNS}
+    projection["_id"] = 0
+    cursor = database.guestbook.find({"wedding_id": wedding_id}, projection).sort("created_at", 1)
+    return csv_export_response(request, cursor, GUESTBOOK_EXPORT_COLUMNS, f"guestbook-{wedding_id}.csv")
+
+# Guestbook pagination - keyset on (created_at, id), newest first
+GUESTBOOK_PAGE_SIZE = 50
+GUESTBOOK_MAX_PAGE_SIZE = 200
+GUESTBOOK_SORT_FIELDS = ["created_at", "id"]
+
+async def fetch_guestbook_page(query: dict, limit: int, cursor: Optional[str]) -> dict:
+    """Fetch one page of guestbook messages matching query"""
+    limit = max(1, min(limit, GUESTBOOK_MAX_PAGE_SIZE))
+    if cursor:
+        try:
+            after = decode_cursor(cursor, len(GUESTBOOK_SORT_FIELDS))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = {"$and": [query, keyset_filter(GUESTBOOK_SORT_FIELDS, after)]}
+    
+    sort = [(field, -1) for field in GUESTBOOK_SORT_FIELDS]
+    messages = await database.guestbook.find(query, {"_id": 0}).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+    
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    next_cursor = encode_cursor(*(messages[-1].get(field) for field in GUESTBOOK_SORT_FIELDS)) if has_more else None
+    
+    return {
+        "success": True,
+        "messages": messages,
+        "total_count": len(messages),
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    }
+
+# Newest public messages for the landing page, served from memory
+public_feed = PublicFeed(
+    size=int(os.getenv("PUBLIC_FEED_SIZE", "50")),
+    poll_interval=float(os.getenv("PUBLIC_FEED_POLL_SECONDS", "5"))
+)
 
 # Guestbook Endpoints
 @api_router.post("/guestbook")
@@ -894,6 +1014,9 @@ async def create_guestbook_message(message_data: dict):
     # Store message in guestbook collection
     guestbook_collection = database.guestbook
     await guestbook_collection.insert_one(message_dict)
+    public_feed.add(message_dict)
+    event_broker.publish(guestbook_message.wedding_id, "guestbook.created", {"id": guestbook_message.id})
+    search_indexes.add_guestbook_message(message_dict)
     
     return {"success": True, "message": "Guestbook message added successfully", "message_id": guestbook_message.id}
 
@@ -908,10 +1031,9 @@ async def create_private_guestbook_message(message_data: dict):
         )
     
     current_user = await get_current_user_simple(session_id)
-    users_coll, weddings_coll = await get_collections()
     
     # Find user's wedding
-    user_wedding = await weddings_coll.find_one({"user_id": current_user.id})
+    user_wedding = await wedding_directory.by_user_id(current_user.id)
     if not user_wedding:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -934,70 +1056,35 @@ async def create_private_guestbook_message(message_data: dict):
     # Store message in guestbook collection
     guestbook_collection = database.guestbook
     await guestbook_collection.insert_one(message_dict)
+    event_broker.publish(guestbook_message.wedding_id, "guestbook.created", {"id": guestbook_message.id})
+    search_indexes.add_guestbook_message(message_dict)
     
     return {"success": True, "message": "Private guestbook message added successfully", "message_id": guestbook_message.id}
 
 @api_router.get("/guestbook/{wedding_id}")
-async def get_guestbook_messages(wedding_id: str):
-    """Get all guestbook messages for a specific wedding"""
-    users_coll, weddings_coll = await get_collections()
-    
-    # Get messages for this wedding
-    guestbook_collection = database.guestbook
-    messages = await guestbook_collection.find({"wedding_id": wedding_id}).sort("created_at", -1).to_list(length=None)
-    
-    # Remove _id from response and format dates
-    response_data = []
-    for msg in messages:
-        clean_msg = {k: v for k, v in msg.items() if k != "_id"}
-        response_data.append(clean_msg)
-    
-    return {"success": True, "messages": response_data, "total_count": len(response_data)}
+async def get_guestbook_messages(wedding_id: str, limit: int = GUESTBOOK_PAGE_SIZE, cursor: Optional[str] = None):
+    """Get a page of guestbook messages for a specific wedding, newest first"""
+    return await fetch_guestbook_page({"wedding_id": wedding_id}, limit, cursor)
 
 @api_router.get("/guestbook/public/messages")
-async def get_public_guestbook_messages():
-    """Get all public guestbook messages (for landing page)"""
-    users_coll, weddings_coll = await get_collections()
+async def get_public_guestbook_messages(limit: int = GUESTBOOK_PAGE_SIZE, cursor: Optional[str] = None):
+    """Get a page of public guestbook messages across all weddings (for landing page)"""
+    # The first page normally comes straight from the in-memory feed
+    if cursor is None and public_feed.seeded and 0 < limit <= public_feed.size:
+        return Response(content=public_feed.encoded_page(limit), media_type="application/json")
     
-    # Get public messages only
-    guestbook_collection = database.guestbook
-    messages = await guestbook_collection.find({"is_public": True}).sort("created_at", -1).to_list(length=None)
-    
-    # Remove _id from response
-    response_data = []
-    for msg in messages:
-        clean_msg = {k: v for k, v in msg.items() if k != "_id"}
-        response_data.append(clean_msg)
-    
-    return {"success": True, "messages": response_data, "total_count": len(response_data)}
+    return await fetch_guestbook_page({"is_public": True}, limit, cursor)
 
 @api_router.get("/guestbook/private/{user_wedding_id}")
-async def get_private_guestbook_messages(user_wedding_id: str):
-    """Get private guestbook messages for a specific user's wedding (dashboard)"""
-    users_coll, weddings_coll = await get_collections()
-    
-    # Get private messages for this specific wedding
-    guestbook_collection = database.guestbook
-    messages = await guestbook_collection.find({
-        "wedding_id": user_wedding_id, 
-        "is_public": False
-    }).sort("created_at", -1).to_list(length=None)
-    
-    # Remove _id from response
-    response_data = []
-    for msg in messages:
-        clean_msg = {k: v for k, v in msg.items() if k != "_id"}
-        response_data.append(clean_msg)
-    
-    return {"success": True, "messages": response_data, "total_count": len(response_data)}
+async def get_private_guestbook_messages(user_wedding_id: str, limit: int = GUESTBOOK_PAGE_SIZE, cursor: Optional[str] = None):
+    """Get a page of private guestbook messages for a specific user's wedding (dashboard)"""
+    return await fetch_guestbook_page({"wedding_id": user_wedding_id, "is_public": False}, limit, cursor)
 
 @api_router.get("/guestbook/shareable/{shareable_id}")  
-async def get_guestbook_by_shareable_id(shareable_id: str):
-    """Get guestbook messages using shareable ID"""
-    users_coll, weddings_coll = await get_collections()
-    
-    # First find the wedding by shareable_id
-    wedding = await weddings_coll.find_one({"shareable_id": shareable_id})
+async def get_guestbook_by_shareable_id(shareable_id: str, limit: int = GUESTBOOK_PAGE_SIZE, cursor: Optional[str] = None):
+    """Get a page of guestbook messages using shareable ID"""
+    # First resolve the shareable_id to the wedding id
+    wedding = await wedding_directory.by_shareable_id(shareable_id)
     
     if not wedding:
         raise HTTPException(
@@ -1005,17 +1092,7 @@ async def get_guestbook_by_shareable_id(shareable_id: str):
             detail="Wedding not found"
         )
     
-    # Get guestbook messages for this wedding
-    guestbook_collection = database.guestbook
-    messages = await guestbook_collection.find({"wedding_id": wedding["id"]}).sort("created_at", -1).to_list(length=None)
-    
-    # Remove _id from response
-    response_data = []
-    for msg in messages:
-        clean_msg = {k: v for k, v in msg.items() if k != "_id"}
-        response_data.append(clean_msg)
-    
-    return {"success": True, "messages": response_data, "total_count": len(response_data)}
+    return await fetch_guestbook_page({"wedding_id": wedding["id"]}, limit, cursor)
 
 # Wedding Party Management Endpoints
 @api_router.put("/wedding/party")
@@ -1053,11 +1130,12 @@ async def update_wedding_party(request_data: dict):
     # Update in MongoDB
     await weddings_coll.update_one(
         {"user_id": current_user.id},
-        {"$set": update_fields}
+        wedding_update(update_fields)
     )
     
     # Get updated wedding data
     updated_wedding = await weddings_coll.find_one({"user_id": current_user.id})
+    invalidate_wedding_caches(updated_wedding["id"], update_fields)
     
     # Also update JSON backup
     weddings = load_json_file(WEDDINGS_FILE)
@@ -1101,11 +1179,12 @@ async def update_wedding_faq(request_data: dict):
     # Update in MongoDB
     await weddings_coll.update_one(
         {"user_id": current_user.id},
-        {"$set": update_fields}
+        wedding_update(update_fields)
     )
     
     # Get updated wedding data
     updated_wedding = await weddings_coll.find_one({"user_id": current_user.id})
+    invalidate_wedding_caches(updated_wedding["id"], update_fields)
     
     # Also update JSON backup
     weddings = load_json_file(WEDDINGS_FILE)
@@ -1157,11 +1236,12 @@ async def update_wedding_theme(request_data: dict):
     # Update in MongoDB
     await weddings_coll.update_one(
         {"user_id": current_user.id},
-        {"$set": update_fields}
+        wedding_update(update_fields)
     )
     
     # Get updated wedding data
     updated_wedding = await weddings_coll.find_one({"user_id": current_user.id})
+    invalidate_wedding_caches(updated_wedding["id"], update_fields)
     
     # Also update JSON backup
     weddings = load_json_file(WEDDINGS_FILE)
@@ -1206,8 +1286,9 @@ async def update_honeymoon_fund(
     
     await weddings_coll.update_one(
         {"user_id": current_user.id},
-        {"$set": update_data}
+        wedding_update(update_data)
     )
+    invalidate_wedding_caches(existing_wedding["id"], update_data)
     
     return {"success": True, "message": "Honeymoon fund configuration updated successfully"}
 
@@ -1216,8 +1297,8 @@ async def get_honeymoon_fund_config(wedding_id: str):
     """Get honeymoon fund configuration for public viewing"""
     users_coll, weddings_coll = await get_collections()
     
-    wedding = await weddings_coll.find_one({"id": wedding_id})
-    if not wedding:
+    wedding = await weddings_coll.find_one({"id": wedding_id}, {"_id": 0, "honeymoon_fund": 1})
+    if wedding is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Wedding not found"
@@ -1231,8 +1312,8 @@ async def get_honeymoon_fund_by_shareable_id(shareable_id: str):
     """Get honeymoon fund configuration by shareable ID"""
     users_coll, weddings_coll = await get_collections()
     
-    wedding = await weddings_coll.find_one({"shareable_id": shareable_id})
-    if not wedding:
+    wedding = await weddings_coll.find_one({"shareable_id": shareable_id}, {"_id": 0, "honeymoon_fund": 1})
+    if wedding is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Wedding not found"
@@ -1241,13 +1322,53 @@ async def get_honeymoon_fund_by_shareable_id(shareable_id: str):
     honeymoon_fund = wedding.get("honeymoon_fund", {})
     return {"honeymoon_fund": honeymoon_fund}
 
+# Idempotency-Key handling for payment creation endpoints
+idempotency_store = IdempotencyStore(ttl=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600")))
+
+async def run_idempotent(scope: str, idempotency_key: Optional[str], payload, response: Response, handler):
+    """Run handler once per Idempotency-Key; duplicates wait for and replay the first result"""
+    if not idempotency_key:
+        return await handler()
+    
+    try:
+        result, replayed = await idempotency_store.run(scope, idempotency_key, fingerprint(payload), handler)
+    except IdempotencyConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except IdempotencyInProgress as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except IdempotencyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
 @api_router.post("/payment/create-intent")
-async def create_payment_intent(payment_request: PaymentRequest):
+async def create_payment_intent(
+    payment_request: PaymentRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
     """Create Stripe payment intent for honeymoon fund contribution"""
+    return await run_idempotent(
+        "create-intent", idempotency_key, payment_request.dict(), response,
+        lambda: process_payment_intent(payment_request, idempotency_key)
+    )
+
+async def process_payment_intent(payment_request: PaymentRequest, idempotency_key: Optional[str] = None):
+    """Create the Stripe PaymentIntent and its pending contribution record"""
     try:
         # Verify wedding exists
-        users_coll, weddings_coll = await get_collections()
-        wedding = await weddings_coll.find_one({"id": payment_request.wedding_id})
+        wedding = await wedding_directory.by_id(payment_request.wedding_id)
         if not wedding:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -1255,17 +1376,17 @@ async def create_payment_intent(payment_request: PaymentRequest):
             )
         
         # Create Stripe payment intent
-        intent = stripe.PaymentIntent.create(
-            amount=int(payment_request.amount * 100),  # Convert to cents/paisa
-            currency=payment_request.currency,
-            metadata={
+        intent = await payment_gateway.create_payment_intent({
+            "amount": int(payment_request.amount * 100),  # Convert to cents/paisa
+            "currency": payment_request.currency,
+            "metadata": {
                 "wedding_id": payment_request.wedding_id,
                 "contributor_name": payment_request.contributor_name,
                 "contributor_email": payment_request.contributor_email,
                 "contributor_phone": payment_request.contributor_phone,
                 "message": payment_request.message or ""
             }
-        )
+        }, idempotency_key=idempotency_key)
         
         # Store payment record in database
         contribution = PaymentContribution(
@@ -1290,7 +1411,9 @@ async def create_payment_intent(payment_request: PaymentRequest):
             "contribution_id": contribution.id
         }
         
-    except stripe.error.StripeError as e:
+    except HTTPException:
+        raise
+    except PaymentGatewayError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Stripe error: {str(e)}"
@@ -1301,50 +1424,231 @@ async def create_payment_intent(payment_request: PaymentRequest):
             detail=f"Payment processing error: {str(e)}"
         )
 
+# Materialized contribution totals - one document per wedding, per-currency buckets
+def currency_key(currency) -> str:
+    """Normalize a currency code for use as a totals field name"""
+    return "".join(ch for ch in str(currency or "inr").lower() if ch.isalnum()) or "inr"
+
+async def add_to_contribution_totals(contribution: dict):
+    """Atomically count one completed contribution in its wedding's totals"""
+    currency = currency_key(contribution.get("currency"))
+    await database.contribution_totals.update_one(
+        {"_id": contribution["wedding_id"]},
+        {
+            "$inc": {
+                f"currencies.{currency}.amount": float(contribution.get("amount") or 0),
+                f"currencies.{currency}.count": 1,
+                "count": 1
+            },
+            "$set": {"updated_at": datetime.utcnow().isoformat()}
+        },
+        upsert=True
+    )
+
+async def apply_contribution_totals(query: dict) -> Optional[dict]:
+    """Count a completed contribution whose totals_applied marker is False; safe to retry after a failure"""
+    # Claim the marker first so concurrent callers cannot both count the row; rows written
+    # before the marker existed have no field and are never matched
+    contribution = await database.contributions.find_one_and_update(
+        {**query, "payment_status": "completed", "totals_applied": False},
+        {"$set": {"totals_applied": True}},
+        projection={"_id": 0, "id": 1, "wedding_id": 1, "amount": 1, "currency": 1}
+    )
+    if contribution is None:
+        return None
+    try:
+        await add_to_contribution_totals(contribution)
+    except Exception:
+        # Release the claim so the next attempt (e.g. Stripe's webhook retry) counts it
+        await database.contributions.update_one({"id": contribution["id"]}, {"$set": {"totals_applied": False}})
+        raise
+    return contribution
+
+async def reconcile_contribution_totals(wedding_id: str = None) -> int:
+    """Recompute totals from completed contributions with an aggregation; returns weddings written"""
+    match = {"payment_status": "completed"}
+    if wedding_id:
+        match["wedding_id"] = wedding_id
+    # The recomputed totals include every completed row, so none may be counted again later
+    await database.contributions.update_many({**match, "totals_applied": False}, {"$set": {"totals_applied": True}})
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"wedding_id": "$wedding_id", "currency": {"$toLower": {"$ifNull": ["$currency", "inr"]}}},
+            "amount": {"$sum": "$amount"},
+            "count": {"$sum": 1}
+        }}
+    ]
+    
+    totals = {}
+    async for group in database.contributions.aggregate(pipeline):
+        doc = totals.setdefault(group["_id"]["wedding_id"], {"currencies": {}, "count": 0})
+        bucket = doc["currencies"].setdefault(currency_key(group["_id"]["currency"]), {"amount": 0.0, "count": 0})
+        bucket["amount"] += float(group["amount"])
+        bucket["count"] += group["count"]
+        doc["count"] += group["count"]
+    
+    now = datetime.utcnow().isoformat()
+    for current_id, doc in totals.items():
+        doc["updated_at"] = now
+        await database.contribution_totals.replace_one({"_id": current_id}, doc, upsert=True)
+    
+    # Weddings that no longer have any completed contributions
+    stale_filter = {"_id": {"$nin": list(totals)}}
+    if wedding_id:
+        stale_filter = {"_id": wedding_id} if wedding_id not in totals else None
+    if stale_filter is not None:
+        await database.contribution_totals.delete_many(stale_filter)
+    
+    return len(totals)
+
+async def normalize_contribution_dates(batch_size: int = 1000) -> int:
+    """Convert contributions whose created_at was stored as an ISO string to datetimes; returns rows fixed"""
+    fixed = 0
+    operations = []
+    cursor = database.contributions.find({"created_at": {"$type": "string"}}, {"_id": 1, "created_at": 1})
+    async for doc in cursor.batch_size(batch_size):
+        try:
+            created_at = datetime.fromisoformat(doc["created_at"].replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if created_at.tzinfo:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"created_at": created_at}}))
+        if len(operations) >= batch_size:
+            fixed += (await database.contributions.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        fixed += (await database.contributions.bulk_write(operations, ordered=False)).modified_count
+    return fixed
+
+# Payment settlement - the single place a contribution leaves "pending"
+SETTLED_STATUS_BY_INTENT_STATUS = {
+    "succeeded": "completed",
+    "canceled": "failed"
+}
+
+async def settle_contribution(payment_intent_id: str, payment_status: str) -> Optional[dict]:
+    """Apply a final status to a Stripe contribution exactly once; returns it only to the caller that did"""
+    # The conditional filter is the idempotency guard for racing webhooks, confirms and sweeps.
+    # A failed attempt can still be followed by a success, never the reverse.
+    from_statuses = ["pending", "failed"] if payment_status == "completed" else ["pending"]
+    update = {"payment_status": payment_status, "updated_at": datetime.utcnow()}
+    if payment_status == "completed":
+        # Counted in the wedding totals by apply_contribution_totals below
+        update["totals_applied"] = False
+    contribution = await database.contributions.find_one_and_update(
+        {"stripe_payment_intent_id": payment_intent_id, "payment_status": {"$in": from_statuses}},
+        {"$set": update},
+        projection={"_id": 0, "id": 1, "wedding_id": 1, "amount": 1, "currency": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    counted = None
+    if payment_status == "completed":
+        # Also picks up a row an earlier attempt completed but failed to count
+        counted = await apply_contribution_totals({"stripe_payment_intent_id": payment_intent_id})
+    changed = contribution or counted
+    if changed:
+        await bump_data_version("contributions", changed["wedding_id"])
+        event_broker.publish(changed["wedding_id"], "contribution.updated", {"id": changed["id"]})
+    return contribution
+
 @api_router.post("/payment/confirm")
 async def confirm_payment(payment_intent_id: str):
     """Confirm payment and update contribution status"""
-    try:
-        # Retrieve payment intent from Stripe
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-        
-        # Update contribution status in database
-        contributions_collection = database.contributions
-        update_result = await contributions_collection.update_one(
-            {"stripe_payment_intent_id": payment_intent_id},
-            {
-                "$set": {
-                    "payment_status": "completed" if intent.status == "succeeded" else "failed",
-                    "updated_at": datetime.utcnow()
-                }
-            }
+    contributions_collection = database.contributions
+    contribution = await contributions_collection.find_one(
+        {"stripe_payment_intent_id": payment_intent_id},
+        {"_id": 0, "payment_status": 1, "amount": 1}
+    )
+    if not contribution:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payment contribution not found"
         )
-        
-        if update_result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Payment contribution not found"
-            )
-        
-        return {
-            "success": True,
-            "payment_status": intent.status,
-            "amount_received": intent.amount_received / 100  # Convert back from cents
-        }
-        
-    except stripe.error.StripeError as e:
+    
+    # Already settled (normally by the webhook) - no Stripe round trip needed
+    if contribution["payment_status"] == "completed":
+        return {"success": True, "payment_status": "succeeded", "amount_received": contribution.get("amount", 0)}
+    
+    try:
+        # Webhook has not arrived yet - ask Stripe directly
+        intent = await payment_gateway.retrieve_payment_intent(payment_intent_id)
+    except PaymentGatewayError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Stripe error: {str(e)}"
         )
+    
+    settled_status = SETTLED_STATUS_BY_INTENT_STATUS.get(intent.status)
+    if settled_status:
+        await settle_contribution(payment_intent_id, settled_status)
+    
+    return {
+        "success": True,
+        "payment_status": intent.status,
+        "amount_received": intent.amount_received / 100  # Convert back from cents
+    }
+
+@api_router.post("/payment/webhook")
+async def stripe_webhook(request: Request, stripe_signature: Optional[str] = Header(None)):
+    """Receive Stripe events and settle contributions (signature-verified, deduplicated)"""
+    if not STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Stripe webhook not configured"
+        )
+    
+    payload = await request.body()
+    try:
+        # Signature checks are cheap, but the first one in a worker imports the Stripe SDK
+        event = await asyncio.to_thread(parse_webhook_event, payload, stripe_signature or "", STRIPE_WEBHOOK_SECRET)
+    except PaymentGatewayError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Record the event id first; Stripe redelivers, so duplicates are acknowledged and skipped
+    try:
+        await database.stripe_events.insert_one({
+            "_id": event["id"],
+            "type": event["type"],
+            "received_at": datetime.utcnow()
+        })
+    except DuplicateKeyError:
+        return {"received": True, "duplicate": True}
+    
+    try:
+        intent = event["data"]["object"]
+        if event["type"] == "payment_intent.succeeded":
+            await settle_contribution(intent["id"], "completed")
+        elif event["type"] in ("payment_intent.payment_failed", "payment_intent.canceled"):
+            await settle_contribution(intent["id"], "failed")
+    except Exception:
+        # Forget the event so Stripe's retry gets processed
+        await database.stripe_events.delete_one({"_id": event["id"]})
+        raise
+    
+    return {"received": True}
 
 @api_router.post("/payment/upi-contribution")
-async def create_upi_contribution(request_data: dict):
+async def create_upi_contribution(
+    request_data: dict,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
     """Create UPI contribution record (non-Stripe payment)"""
+    return await run_idempotent(
+        "upi-contribution", idempotency_key, request_data, response,
+        lambda: process_upi_contribution(request_data)
+    )
+
+async def process_upi_contribution(request_data: dict):
+    """Record a completed UPI contribution"""
     try:
         # Verify wedding exists
-        users_coll, weddings_coll = await get_collections()
-        wedding = await weddings_coll.find_one({"id": request_data.get("wedding_id")})
+        wedding = await wedding_directory.by_id(request_data.get("wedding_id"))
         if not wedding:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -1367,11 +1671,14 @@ async def create_upi_contribution(request_data: dict):
         # Store in MongoDB
         contributions_collection = database.contributions
         contribution_dict = contribution.dict()
-        contribution_dict["created_at"] = contribution_dict["created_at"].isoformat()
         contribution_dict["payment_method"] = "upi"
         contribution_dict["upi_reference"] = request_data.get("upi_reference", "")
+        contribution_dict["totals_applied"] = False
         
         await contributions_collection.insert_one(contribution_dict)
+        await apply_contribution_totals({"id": contribution.id})
+        await bump_data_version("contributions", contribution.wedding_id)
+        event_broker.publish(contribution.wedding_id, "contribution.updated", {"id": contribution.id})
         
         return {
             "success": True,
@@ -1379,148 +1686,679 @@ async def create_upi_contribution(request_data: dict):
             "message": "UPI contribution recorded successfully"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"UPI contribution processing error: {str(e)}"
         )
 
-@api_router.get("/payment/contributions/{wedding_id}")
-async def get_contributions(wedding_id: str, session_id: str = None):
-    """Get all contributions for a wedding (admin only)"""
-    if not session_id:
+# Contribution ledger: keyset-paginated, projected, newest first
+LEDGER_PAGE_SIZE = 50
+LEDGER_MAX_PAGE_SIZE = 200
+LEDGER_SORT_FIELDS = ["created_at", "id"]
+LEDGER_COLUMNS = [
+    "id", "contributor_name", "contributor_email", "contributor_phone", "amount", "currency",
+    "payment_status", "payment_method", "message", "created_at"
+]
+LEDGER_STATUSES = ("completed", "pending", "failed", "all")
+
+def parse_ledger_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Session ID required"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name} date"
         )
-    
-    current_user = await get_current_user_simple(session_id)
-    users_coll, weddings_coll = await get_collections()
-    
-    # Verify user owns this wedding
-    wedding = await weddings_coll.find_one({"id": wedding_id, "user_id": current_user.id})
-    if not wedding:
+    # created_at is stored as naive UTC
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def contribution_ledger_query(wedding_id: str, payment_status: str, since: Optional[str], until: Optional[str]) -> dict:
+    """Mongo filter for a wedding's ledger with optional status and [since, until) date range"""
+    if payment_status not in LEDGER_STATUSES:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to view these contributions"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"status must be one of: {', '.join(LEDGER_STATUSES)}"
         )
+    query = {"wedding_id": wedding_id}
+    if payment_status != "all":
+        query["payment_status"] = payment_status
+    
+    created_range = {}
+    since_at = parse_ledger_date(since, "since")
+    until_at = parse_ledger_date(until, "until")
+    if since_at:
+        created_range["$gte"] = since_at
+    if until_at:
+        created_range["$lt"] = until_at
+    if created_range:
+        query["created_at"] = created_range
+    return query
+
+@api_router.get("/payment/contributions/{wedding_id}")
+async def get_contributions(
+    wedding_id: str,
+    session_id: str = None,
+    limit: int = LEDGER_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    payment_status: str = Query("completed", alias="status"),
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Page through a wedding's contributions, newest first (owner only)"""
+    wedding_id = await require_wedding_owner(wedding_id, session_id)
     
-    # Get all completed contributions
-    contributions_collection = database.contributions
-    contributions = await contributions_collection.find({
-        "wedding_id": wedding_id,
-        "payment_status": "completed"
-    }).to_list(length=None)
+    query = contribution_ledger_query(wedding_id, payment_status, since, until)
+    return await fetch_contribution_page(wedding_id, query, limit, cursor)
+
+async def fetch_contribution_page(wedding_id: str, query: dict, limit: int, cursor: Optional[str]) -> dict:
+    """Fetch one ledger page matching query, plus the wedding's contribution totals"""
+    limit = max(1, min(limit, LEDGER_MAX_PAGE_SIZE))
+    if cursor:
+        try:
+            after = decode_cursor(cursor, len(LEDGER_SORT_FIELDS))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = {"$and": [query, keyset_filter(LEDGER_SORT_FIELDS, after)]}
+    
+    projection = {column: 1 for column in LEDGER_COLUMNS}
+    projection["_id"] = 0
+    sort = [(field, -1) for field in LEDGER_SORT_FIELDS]
+    contributions, totals = await asyncio.gather(
+        database.contributions.find(query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1),
+        database.contribution_totals.find_one({"_id": wedding_id})
+    )
     
-    # Calculate total amount
-    total_amount = sum(contrib.get("amount", 0) for contrib in contributions)
+    has_more = len(contributions) > limit
+    contributions = contributions[:limit]
+    next_cursor = encode_cursor(*(contributions[-1].get(field) for field in LEDGER_SORT_FIELDS)) if has_more else None
     
+    # Totals cover all completed contributions, independent of paging and filters
     return {
         "contributions": contributions,
-        "total_amount": total_amount,
-        "currency": contributions[0].get("currency", "inr") if contributions else "inr",
-        "count": len(contributions)
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        **format_contribution_totals(totals or {})
     }
 
+@api_router.get("/payment/contributions/{wedding_id}/export.csv")
+async def export_contributions_csv(
+    wedding_id: str,
+    request: Request,
+    session_id: str = None,
+    payment_status: str = Query("completed", alias="status"),
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Download a wedding's contribution ledger as CSV for accounting (owner only)"""
+    wedding_id = await require_wedding_owner(wedding_id, session_id)
+    
+    query = contribution_ledger_query(wedding_id, payment_status, since, until)
+    projection = {column: 1 for column in LEDGER_COLUMNS}
+    projection["_id"] = 0
+    cursor = database.contributions.find(query, projection).sort([(field, 1) for field in LEDGER_SORT_FIELDS])
+    return csv_export_response(request, cursor, LEDGER_COLUMNS, f"contributions-{wedding_id}.csv")
+
 @api_router.get("/payment/total/{wedding_id}")
 async def get_contributions_total(wedding_id: str):
     """Get total contributions for a wedding (public endpoint)"""
-    users_coll, weddings_coll = await get_collections()
+    totals = await database.contribution_totals.find_one({"_id": wedding_id})
     
-    # Verify wedding exists
-    wedding = await weddings_coll.find_one({"id": wedding_id})
+    if not totals:
+        # No completed contributions yet - only now is it worth checking the wedding exists
+        wedding = await wedding_directory.by_id(wedding_id)
+        if not wedding:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Wedding not found"
+            )
+        totals = {"currencies": {}, "count": 0}
+    
+    return format_contribution_totals(totals)
+
+def format_contribution_totals(totals: dict) -> dict:
+    """Shape a totals document for API responses"""
+    currencies = totals.get("currencies", {})
+    by_currency = [
+        {"currency": currency, "total_amount": round(bucket.get("amount", 0), 2), "count": bucket.get("count", 0)}
+        for currency, bucket in sorted(currencies.items(), key=lambda item: -item[1].get("count", 0))
+    ]
+    # total_amount/currency describe the main currency; by_currency has the full breakdown
+    primary = by_currency[0] if by_currency else {"currency": "inr", "total_amount": 0}
+    return {
+        "total_amount": primary["total_amount"],
+        "currency": primary["currency"],
+        "count": totals.get("count", 0),
+        "by_currency": by_currency
+    }
+
+# Dashboard - everything the couple's dashboard shows, in one round trip
+DASHBOARD_SECTIONS = ("wedding", "rsvps", "guestbook", "contributions")
+
+async def load_dashboard_section(section: str, wedding_id: str):
+    """Fetch one dashboard section with the same shape as its standalone endpoint"""
+    if section == "wedding":
+        users_coll, weddings_coll = await get_collections()
+        return await weddings_coll.find_one({"id": wedding_id}, {"_id": 0})
+    if section == "rsvps":
+        rsvps, summary = await asyncio.gather(
+            database.rsvps.find({"wedding_id": wedding_id}, {"_id": 0}).to_list(length=None),
+            get_rsvp_summary(wedding_id)
+        )
+        return {"rsvps": rsvps, "total_count": len(rsvps), "summary": summary["summary"]}
+    if section == "guestbook":
+        return await fetch_guestbook_page({"wedding_id": wedding_id, "is_public": False}, GUESTBOOK_PAGE_SIZE, None)
+    if section == "contributions":
+        query = contribution_ledger_query(wedding_id, "completed", None, None)
+        return await fetch_contribution_page(wedding_id, query, LEDGER_PAGE_SIZE, None)
+
+def dashboard_section_version(section: str, data, counters: dict) -> str:
+    """Opaque token that changes whenever the section's content does"""
+    if section == "wedding":
+        return str(data.get("updated_at")) if data else "0"
+    if section == "guestbook":
+        # Guestbook messages are insert-only, so the newest id identifies the page
+        messages = data.get("messages") or []
+        return messages[0]["id"] if messages else "0"
+    return str(counters.get(section, 0))
+
+@api_router.get("/dashboard")
+async def get_dashboard(session_id: str = None, sections: Optional[str] = None):
+    """Wedding, RSVPs, private guestbook and contributions for the session's wedding (owner only)"""
+    if not session_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session ID required"
+        )
+    requested = DASHBOARD_SECTIONS
+    if sections:
+        requested = tuple(name for name in DASHBOARD_SECTIONS if name in sections.split(","))
+        if not requested:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"sections must name any of: {', '.join(DASHBOARD_SECTIONS)}"
+            )
+    
+    # Authenticate and resolve the wedding once for every section
+    current_user = await get_current_user_simple(session_id)
+    wedding = await wedding_directory.by_user_id(current_user.id)
     if not wedding:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Wedding not found"
+            detail="Wedding data not found"
         )
+    wedding_id = wedding["id"]
     
-    # Get total from completed contributions
-    contributions_collection = database.contributions
-    contributions = await contributions_collection.find({
-        "wedding_id": wedding_id,
-        "payment_status": "completed"
-    }).to_list(length=None)
-    
-    total_amount = sum(contrib.get("amount", 0) for contrib in contributions)
+    # Sections load concurrently: dashboard latency is the slowest query, not the sum
+    version_keys = [f"{kind}:{wedding_id}" for kind in ("rsvps", "contributions")]
+    results = await asyncio.gather(
+        get_data_versions(*version_keys),
+        *(load_dashboard_section(section, wedding_id) for section in requested)
+    )
+    counters = dict(zip(("rsvps", "contributions"), results[0]))
+    payload = dict(zip(requested, results[1:]))
     
     return {
-        "total_amount": total_amount,
-        "currency": contributions[0].get("currency", "inr") if contributions else "inr",
-        "count": len(contributions)
+        "success": True,
+        "wedding_id": wedding_id,
+        "versions": {section: dashboard_section_version(section, payload[section], counters) for section in requested},
+        **payload
     }
 
+# Search Endpoints
+@api_router.get("/search/{wedding_id}")
+async def search_wedding(wedding_id: str, q: str, limit: int = 10, session_id: str = None):
+    """Ranked prefix search over a wedding's guestbook messages and RSVP notes (owner only)"""
+    wedding_id = await require_wedding_owner(wedding_id, session_id)
+    
+    index = await search_indexes.get(wedding_id, database)
+    hits = index.search(q, max(1, min(limit, 100)))
+    return {"success": True, "query": q, "results": hits, "total_count": len(hits)}
+
+# Live update stream
+@api_router.get("/events/{wedding_id}")
+async def stream_wedding_events(wedding_id: str):
+    """Server-Sent Events stream of change notifications for a wedding"""
+    return StreamingResponse(
+        event_broker.stream(wedding_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+# Analytics Endpoints
+@api_router.get("/analytics/wedding/{wedding_id}")
+async def get_wedding_analytics(
+    wedding_id: str,
+    session_id: str = None,
+    invite_sent_at: Optional[datetime] = None,
+    expected_invites: Optional[int] = None
+):
+    """RSVP and contribution reports for one wedding (owner only)"""
+    wedding_id = await require_wedding_owner(wedding_id, session_id)
+    
+    # Without an explicit send time, measure responses from when the card was created
+    if invite_sent_at is None:
+        wedding = await database.weddings.find_one({"id": wedding_id}, {"_id": 0, "created_at": 1})
+        if wedding and wedding.get("created_at"):
+            invite_sent_at = datetime.fromisoformat(str(wedding["created_at"]))
+    
+    # The first report in a worker imports pandas/numpy; do that off the event loop
+    await analytics.aload()
+    version = await get_data_versions(f"rsvps:{wedding_id}", f"contributions:{wedding_id}")
+    cache_key = ("wedding", wedding_id, invite_sent_at, expected_invites)
+    report = analytics.report_cache.get(cache_key, version)
+    if report is None:
+        rsvp_frame, contribution_frame = await asyncio.gather(
+            analytics.load_frame(database.rsvps, {"wedding_id": wedding_id}, analytics.RSVP_COLUMNS),
+            analytics.load_frame(
+                database.contributions,
+                {"wedding_id": wedding_id, "payment_status": "completed"},
+                analytics.CONTRIBUTION_COLUMNS
+            )
+        )
+        # Report computation is CPU-bound; keep it off the event loop
+        rsvps, contributions = await asyncio.gather(
+            asyncio.to_thread(analytics.rsvp_report, rsvp_frame, invite_sent_at, expected_invites),
+            asyncio.to_thread(analytics.contribution_report, contribution_frame)
+        )
+        report = {"wedding_id": wedding_id, "rsvps": rsvps, "contributions": contributions}
+        analytics.report_cache.put(cache_key, version, report)
+    
+    return {"success": True, "report": report}
+
+@api_router.get("/analytics/fleet")
+async def get_fleet_analytics(x_admin_token: Optional[str] = Header(None)):
+    """Platform-wide RSVP and contribution reports (admin only)"""
+    require_admin(x_admin_token)
+    
+    await analytics.aload()
+    version = await get_data_versions("rsvps:*", "contributions:*")
+    report = analytics.report_cache.get(("fleet",), version)
+    if report is None:
+        rsvp_frame, contribution_frame = await asyncio.gather(
+            analytics.load_frame(database.rsvps, {}, analytics.RSVP_COLUMNS),
+            analytics.load_frame(database.contributions, {"payment_status": "completed"}, analytics.CONTRIBUTION_COLUMNS)
+        )
+        report = await asyncio.to_thread(analytics.fleet_report, rsvp_frame, contribution_frame)
+        analytics.report_cache.put(("fleet",), version, report)
+    
+    return {"success": True, "report": report}
+
+# Background jobs
+pending_sweeper = None
+
+@api_router.get("/admin/jobs/pending-sweeper")
+async def get_pending_sweeper_stats(x_admin_token: Optional[str] = Header(None)):
+    """Throughput and lag of the pending-contribution sweeper in this worker (admin only)"""
+    require_admin(x_admin_token)
+    if pending_sweeper is None:
+        return {"enabled": False}
+    return {"enabled": True, **pending_sweeper.stats}
+
+@api_router.get("/admin/compression")
+async def get_compression_stats(x_admin_token: Optional[str] = Header(None)):
+    """Response compression volume and CPU cost in this worker (admin only)"""
+    require_admin(x_admin_token)
+    return compression_stats.as_dict()
+
+# On-demand profiling (nothing is sampled or traced until an operator asks)
+cpu_sampler = CpuSampler()
+memory_profiler = MemoryProfiler()
+
+@api_router.get("/admin/profile/cpu")
+async def get_cpu_profile(
+    seconds: float = Query(10.0, gt=0, le=MAX_CPU_SECONDS),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    all_threads: bool = False,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Sample this worker's stacks for a few seconds; collapsed stacks or a speedscope file (admin only)"""
+    require_admin(x_admin_token)
+    try:
+        # The sampler sleeps between samples on its own thread, so the loop keeps serving
+        profile = await asyncio.to_thread(cpu_sampler.profile, seconds, interval_ms / 1000, all_threads)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    if format == "speedscope":
+        return Response(
+            content=json.dumps(CpuSampler.speedscope(profile, f"worker {os.getpid()} {stamp}")),
+            media_type="application/json",
+            headers={"Content-Disposition": f'attachment; filename="cpu-{os.getpid()}-{stamp}.speedscope.json"'}
+        )
+    return Response(
+        content=CpuSampler.collapsed(profile),
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "Content-Disposition": f'attachment; filename="cpu-{os.getpid()}-{stamp}.folded"',
+            "X-Profile-Samples": str(profile["samples"])
+        }
+    )
+
+@api_router.post("/admin/profile/memory/start")
+async def start_memory_profile(
+    frames: int = Query(10, ge=1, le=50),
+    max_seconds: float = Query(900.0, gt=0, le=3600),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Start tracing allocations in this worker; stops by itself after max_seconds (admin only)"""
+    require_admin(x_admin_token)
+    try:
+        memory_profiler.start(frames, max_seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"success": True, "frames": frames, "max_seconds": max_seconds}
+
+@api_router.get("/admin/profile/memory")
+async def get_memory_profile(
+    limit: int = Query(25, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Top allocation sites and growth since start (admin only)"""
+    require_admin(x_admin_token)
+    if not memory_profiler.active:
+        raise HTTPException(status_code=409, detail="Memory tracing is not running; POST /api/admin/profile/memory/start first")
+    report = await asyncio.to_thread(memory_profiler.report, limit, group_by)
+    return {"session_cache_entries": len(active_sessions), **report}
+
+@api_router.post("/admin/profile/memory/stop")
+async def stop_memory_profile(x_admin_token: Optional[str] = Header(None)):
+    """Stop tracing allocations and drop the baseline snapshot (admin only)"""
+    require_admin(x_admin_token)
+    was_active = memory_profiler.active
+    if was_active:
+        memory_profiler.stop()
+    return {"success": True, "was_active": was_active}
+
 # Test endpoint to verify connectivity
 @api_router.get("/test")
 async def test_endpoint():
     return {"status": "ok", "message": "Backend is working", "timestamp": datetime.utcnow()}
 
 # Serve React static files (production setup)
-FRONTEND_BUILD_PATH = ROOT_DIR.parent / "frontend" / "build"
-
-# Include the API router first (higher priority)
-app.include_router(api_router)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000", "*"],
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-    expose_headers=["*"],
+FRONTEND_BUILD_PATH = settings.FRONTEND_BUILD_PATH
+
+# Routes outside /api: metrics, shared links and the React app
+site_router = APIRouter(route_class=InstrumentedRoute)
+
+# Compression counters and the opt-in event loop blocking detector (LOOP_WATCHDOG_MS)
+compression_stats = CompressionStats()
+loop_watchdog = watchdog_from_env()
+
+# Prometheus metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+loop_lag_monitor = EventLoopLagMonitor(interval=float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.5")))
+
+def collect_app_metrics() -> list:
+    """Scrape-time view of caches, sessions, live connections and background jobs"""
+    caches = {
+        "search_indexes": search_indexes,
+        "share_pages": share_pages,
+        "wedding_sections": section_cache,
+        "wedding_directory": wedding_directory
+    }
+    # Scraping must not be what imports pandas
+    if analytics.loaded:
+        caches["analytics_reports"] = analytics.report_cache
+    hits = Counter("cache_hits_total", "Cache lookups answered from cache", ("cache",))
+    misses = Counter("cache_misses_total", "Cache lookups that missed", ("cache",))
+    ratio = Gauge("cache_hit_ratio", "Cache hits / lookups", ("cache",))
+    for name, cache in caches.items():
+        hits.inc(name, amount=cache.hits)
+        misses.inc(name, amount=cache.misses)
+        lookups = cache.hits + cache.misses
+        ratio.set(cache.hits / lookups if lookups else 0.0, name)
+    
+    sessions = Gauge("session_cache_entries", "Sessions held in the in-memory session cache")
+    sessions.set(len(active_sessions))
+    subscribers = Gauge("sse_subscribers", "Connected Server-Sent Events clients")
+    subscribers.set(event_broker.subscriber_count)
+    
+    metrics = [hits, misses, ratio, sessions, subscribers]
+    metrics.extend(snapshot_gauges("compression", "Response compression", compression_stats.as_dict()))
+    if pending_sweeper is not None:
+        metrics.extend(snapshot_gauges("pending_sweeper", "Pending contribution sweeper", pending_sweeper.stats))
+    return metrics
+
+metrics_registry.add_collector(collect_app_metrics)
+
+@site_router.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition of this worker's metrics"""
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Metrics token required"
+        )
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Rendered /share/{shareable_id} pages, keyed by shareable_id + updated_at
+share_pages = SharePageCache(
+    max_entries=int(os.getenv("SHARE_PAGE_CACHE_SIZE", "1000")),
+    revalidate_interval=float(os.getenv("SHARE_PAGE_REVALIDATE_SECONDS", "60"))
+)
+
+# Serve static files and React app from a manifest built once at startup
+static_manifest = StaticManifest(
+    FRONTEND_BUILD_PATH,
+    memory_max_bytes=int(os.getenv("STATIC_MEMORY_MAX_BYTES", str(512 * 1024)))
 )
 
-# Serve static files and React app
 if FRONTEND_BUILD_PATH.exists():
-    print(f"✅ Frontend build found at: {FRONTEND_BUILD_PATH}")
-    app.mount("/static", StaticFiles(directory=str(FRONTEND_BUILD_PATH / "static")), name="static")
+    logger.info(f"✅ Frontend build found at: {FRONTEND_BUILD_PATH}")
+    
+    @site_router.get("/share/{shareable_id}")
+    async def serve_share_page(shareable_id: str, request: Request):
+        """Serve a shared wedding link pre-rendered with social meta tags and inlined data"""
+        index_asset = static_manifest.get("index.html")
+        if settings.PUBLIC_BASE_URL:
+            cache_key = shareable_id
+            page_url = f"{settings.PUBLIC_BASE_URL}/share/{shareable_id}"
+        else:
+            # og:url falls back to the request's Host, which the client controls: cache per host
+            # so a spoofed Host cannot poison the page other visitors get
+            cache_key = f"{request.url.netloc}/{shareable_id}"
+            page_url = f"{request.base_url}share/{shareable_id}"
+        page = share_pages.get(cache_key)
+        users_coll, weddings_coll = await get_collections()
+        
+        if index_asset is not None and page is not None and share_pages.needs_revalidation(page):
+            # Pick up writes made by other workers
+            current = await weddings_coll.find_one({"shareable_id": shareable_id}, {"_id": 0, "updated_at": 1})
+            if current is not None and str(current.get("updated_at")) == page.updated_at:
+                page.checked_at = time.monotonic()
+            else:
+                page = None
+        
+        if index_asset is not None and page is None:
+            share_pages.misses += 1
+            wedding = await weddings_coll.find_one({"shareable_id": shareable_id}, {"_id": 0, "user_id": 0})
+            if wedding is not None:
+                index_html = (index_asset.body or index_asset.path.read_bytes()).decode("utf-8")
+                # Rendering and precompressing a wedding with inline images is CPU-heavy; keep it off the event loop
+                with span("share_page.render", "serialize"):
+                    body = await asyncio.to_thread(render_share_page, index_html, wedding, page_url)
+                page = await asyncio.to_thread(SharePage, wedding["id"], str(wedding.get("updated_at")), body.encode("utf-8"))
+                share_pages.put(cache_key, page)
+        elif page is not None:
+            share_pages.hits += 1
+        
+        if page is None:
+            # Unknown link or no index.html: let the React app handle it
+            return await serve_react_app(f"share/{shareable_id}", request)
+        
+        return negotiated_response(
+            page.body, page.variants, page.etag, "text/html", "no-cache",
+            accept_encoding=request.headers.get("accept-encoding", ""),
+            if_none_match=request.headers.get("if-none-match", "")
+        )
     
-    @app.get("/{full_path:path}")
-    async def serve_react_app(full_path: str):
+    @site_router.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+    async def serve_react_app(full_path: str, request: Request):
         """Serve React app for all non-API routes"""
-        print(f"🌐 Serving route: {full_path}")
-        
         # Skip API routes (they are handled by api_router)
         if full_path.startswith("api"):
-            print(f"❌ API route not found: {full_path}")
             raise HTTPException(status_code=404, detail="API endpoint not found")
         
-        # Check if it's a direct file request
-        if full_path and not full_path.startswith("api"):
-            static_file_path = FRONTEND_BUILD_PATH / full_path
-            if static_file_path.exists() and static_file_path.is_file():
-                print(f"📁 Serving static file: {static_file_path}")
-                return FileResponse(static_file_path)
+        # Direct file request, otherwise (including custom wedding URLs) the React index.html
+        asset = static_manifest.get(full_path) if full_path else None
+        if asset is None:
+            if full_path.startswith(static_manifest.immutable_prefix):
+                raise HTTPException(status_code=404, detail="Static file not found")
+            asset = static_manifest.get("index.html")
+            if asset is None:
+                raise HTTPException(status_code=404, detail="Frontend build is missing index.html")
         
-        # For all other routes (including custom wedding URLs), serve React index.html
-        index_path = FRONTEND_BUILD_PATH / "index.html"
-        print(f"⚛️ Serving React app: {index_path}")
-        return FileResponse(index_path)
+        return static_manifest.response(
+            asset,
+            accept_encoding=request.headers.get("accept-encoding", ""),
+            if_none_match=request.headers.get("if-none-match", "")
+        )
 else:
-    print(f"❌ Frontend build not found at: {FRONTEND_BUILD_PATH}")
-    print("React static file serving disabled")
+    logger.warning(f"❌ Frontend build not found at: {FRONTEND_BUILD_PATH}; React static file serving disabled")
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+async def ensure_indexes():
+    """Create the indexes the query paths rely on (idempotent)"""
+    if database is None:
+        return
+    try:
+        await database.rsvps.create_index([("wedding_id", 1), ("submitted_at", 1)])
+        await database.contributions.create_index([("wedding_id", 1), ("payment_status", 1), ("created_at", -1), ("id", -1)])
+        await database.contributions.create_index([("wedding_id", 1), ("created_at", -1), ("id", -1)])
+        await database.contributions.create_index("stripe_payment_intent_id")
+        await database.contributions.create_index([("payment_status", 1), ("created_at", 1), ("id", 1)])
+        await database.rsvp_summaries.create_index("wedding_id", unique=True)
+        await database.guestbook.create_index([("wedding_id", 1), ("created_at", -1), ("id", -1)])
+        await database.guestbook.create_index([("wedding_id", 1), ("is_public", 1), ("created_at", -1), ("id", -1)])
+        await database.guestbook.create_index([("is_public", 1), ("created_at", -1), ("id", -1)])
+    except Exception as e:
+        logger.error(f"❌ Error creating MongoDB indexes: {e}")
 
 # Startup and shutdown events for MongoDB
-@app.on_event("startup")
 async def startup_event():
+    if FRONTEND_BUILD_PATH.exists():
+        # Hashing and precompressing the bundles is CPU-bound; keep it off the event loop
+        count = await asyncio.to_thread(static_manifest.build)
+        logger.info(f"📦 Indexed {count} static files ({static_manifest.memory_bytes // 1024} KiB in memory)")
+    loop_lag_monitor.start()
+    if loop_watchdog is not None:
+        loop_watchdog.start()
+        logger.info(f"🐕 Event loop watchdog reporting callbacks over {loop_watchdog.threshold * 1000:.0f} ms")
     await connect_to_mongo()
+    await ensure_indexes()
+    if database is not None:
+        idempotency_store.attach(database.idempotency_keys)
+        try:
+            await idempotency_store.ensure_indexes()
+        except Exception as e:
+            logger.error(f"❌ Error creating idempotency TTL index: {e}")
+        
+        wedding_directory.attach(database.weddings, database.users)
+        try:
+            await wedding_directory.ensure_indexes()
+        except Exception as e:
+            logger.error(f"❌ Error creating wedding identity indexes: {e}")
+        
+        try:
+            await public_feed.seed(database.guestbook)
+            public_feed.start(database.guestbook)
+        except Exception as e:
+            logger.error(f"❌ Error seeding public guestbook feed: {e}")
+        
+        global pending_sweeper
+        pending_sweeper = PendingContributionSweeper(
+            database,
+            payment_gateway,
+            settle_contribution,
+            interval=float(os.getenv("PENDING_SWEEP_INTERVAL_SECONDS", "300")),
+            stale_after=float(os.getenv("PENDING_STALE_MINUTES", "30")) * 60,
+            abandon_after=float(os.getenv("PENDING_ABANDON_HOURS", "24")) * 3600,
+            batch_size=int(os.getenv("PENDING_SWEEP_BATCH_SIZE", "100")),
+            concurrency=int(os.getenv("PENDING_SWEEP_CONCURRENCY", "4"))
+        )
+        pending_sweeper.start()
     logger.info("✅ Wedding Card API started successfully")
 
-@app.on_event("shutdown")
 async def shutdown_event():
+    await loop_lag_monitor.stop()
+    if loop_watchdog is not None:
+        await loop_watchdog.stop()
+    await public_feed.stop()
+    if pending_sweeper is not None:
+        await pending_sweeper.stop()
     await close_mongo_connection()
+    payment_gateway.close()
+    if memory_profiler.active:
+        memory_profiler.stop()
     active_sessions.clear()
     # Note: Sessions are persisted in MongoDB and will be restored on restart
     logger.info("👋 Wedding Card API shutdown complete")
 
+def create_app() -> FastAPI:
+    """Assemble the ASGI app: routers, middleware stack and lifecycle hooks"""
+    app = FastAPI(default_response_class=TracedJSONResponse)
+    
+    # Include the API router first (higher priority), then the catch-all site routes
+    app.include_router(api_router)
+    app.include_router(site_router)
+    
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["http://localhost:3000", "http://127.0.0.1:3000", "*"],
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+    )
+    
+    # Compress large JSON/HTML responses (already-encoded responses pass through)
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+        gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+        stats=compression_stats
+    )
+    
+    # Per-request spans, slow-request log and optional OTLP file export
+    app.add_middleware(
+        TracingMiddleware,
+        slow_request_ms=float(os.getenv("SLOW_REQUEST_MS", "500")),
+        exporter=exporter_from_env(),
+        export_sample_rate=float(os.getenv("OTLP_TRACE_SAMPLE_RATE", "1.0"))
+    )
+    
+    # Event loop watchdog sits inside RequestIdMiddleware so offenders are
+    # reported with their request id
+    if loop_watchdog is not None:
+        app.add_middleware(LoopWatchdogMiddleware, watchdog=loop_watchdog)
+    
+    # Request ids for every log record, access log for API calls only
+    app.add_middleware(RequestIdMiddleware)
+    
+    # Outermost: route latency histograms cover the whole middleware stack
+    app.add_middleware(MetricsMiddleware)
+    
+    app.add_event_handler("startup", startup_event)
+    app.add_event_handler("shutdown", shutdown_event)
+    return app
+
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1528,5 +2366,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8001,
         reload=False,
-        log_level="info"
+        log_level="info",
+        # Logging is configured by configure_logging()
+        log_config=None
     )
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+RSVP and contribution analytics
+
+Data is pulled from MongoDB through projected, batched cursors into
+columnar pandas frames; every report is computed with vectorized
+operations. Results are cached per (report, parameters) and reused for
+as long as the caller-supplied input version is unchanged.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+RSVP_COLUMNS = ["wedding_id", "attendance", "guest_count", "dietary_restrictions", "submitted_at"]
+CONTRIBUTION_COLUMNS = ["wedding_id", "amount", "currency", "payment_status", "created_at"]
+
+DEFAULT_BATCH_SIZE = 5000
+
+async def load_frame(collection, query: dict, columns: list, batch_size: int = DEFAULT_BATCH_SIZE) -> pd.DataFrame:
+    """Stream a projected cursor into a column-oriented DataFrame"""
+    projection = {column: 1 for column in columns}
+    projection["_id"] = 0
+
+    data = {column: [] for column in columns}
+    cursor = collection.find(query, projection).batch_size(batch_size)
+    async for doc in cursor:
+        for column in columns:
+            data[column].append(doc.get(column))
+
+    return pd.DataFrame(data, columns=columns)
+
+def _to_utc(values: pd.Series) -> pd.Series:
+    """Parse a column of datetimes / ISO strings (stored inconsistently) to UTC timestamps"""
+    return pd.to_datetime(values, utc=True, errors="coerce", format="mixed")
+
+def _days(values: pd.Series) -> pd.Series:
+    """UTC calendar day of each timestamp (vectorized; format only the group keys)"""
+    return _to_utc(values).dt.floor("D")
+
+def _day_label(day: pd.Timestamp) -> str:
+    return day.strftime("%Y-%m-%d")
+
+def _dietary_buckets(values: pd.Series) -> pd.Series:
+    buckets = values.fillna("").astype(str).str.strip().str.lower().str.replace(r"\s+", " ", regex=True)
+    return buckets.mask(buckets == "", "none")
+
+def rsvp_report(frame: pd.DataFrame, invite_sent_at: Optional[datetime] = None,
+                expected_invites: Optional[int] = None) -> dict:
+    """Response-rate time series, headcount projection and dietary breakdown"""
+    submitted = _to_utc(frame["submitted_at"])
+    guest_count = pd.to_numeric(frame["guest_count"], errors="coerce").fillna(1).astype(np.int64)
+    attending = (frame["attendance"] == "yes").to_numpy()
+    declined = (frame["attendance"] == "no").to_numpy()
+    responded = int(len(frame))
+
+    # Response-rate time series: responses per day since the invite went out
+    if invite_sent_at is not None:
+        origin = pd.Timestamp(invite_sent_at)
+        origin = origin.tz_localize("UTC") if origin.tzinfo is None else origin.tz_convert("UTC")
+    elif submitted.notna().any():
+        origin = submitted.min()
+    else:
+        origin = None
+
+    timeline = []
+    if origin is not None and responded:
+        days = ((submitted - origin).dt.total_seconds() // 86400).clip(lower=0)
+        per_day = days.dropna().astype(np.int64).value_counts().sort_index()
+        cumulative = per_day.cumsum()
+        rate = cumulative / expected_invites if expected_invites else pd.Series(np.nan, index=cumulative.index)
+        timeline = [
+            {
+                "day": int(day),
+                "responses": int(count),
+                "cumulative": int(total),
+                "response_rate": None if np.isnan(ratio) else round(float(ratio), 4)
+            }
+            for day, count, total, ratio in zip(per_day.index, per_day.to_numpy(), cumulative.to_numpy(), rate.to_numpy())
+        ]
+
+    # Headcount projection: confirmed guests plus the expected yield of outstanding invites
+    confirmed_guests = int(guest_count.to_numpy()[attending].sum())
+    attending_count = int(attending.sum())
+    yes_rate = attending_count / responded if responded else 0.0
+    avg_party_size = confirmed_guests / attending_count if attending_count else 1.0
+    outstanding = max((expected_invites or 0) - responded, 0)
+    projected_guests = confirmed_guests + outstanding * yes_rate * avg_party_size
+
+    # Dietary breakdown over attending guests
+    dietary = (
+        pd.DataFrame({
+            "bucket": _dietary_buckets(frame["dietary_restrictions"])[attending],
+            "guests": guest_count[attending]
+        })
+        .groupby("bucket")["guests"]
+        .agg(["count", "sum"])
+        .sort_values("sum", ascending=False)
+    )
+
+    return {
+        "responses": responded,
+        "attending_count": attending_count,
+        "declined_count": int(declined.sum()),
+        "response_timeline": timeline,
+        "headcount": {
+            "confirmed_guests": confirmed_guests,
+            "yes_rate": round(yes_rate, 4),
+            "average_party_size": round(avg_party_size, 2),
+            "outstanding_invites": outstanding,
+            "projected_guests": int(round(projected_guests))
+        },
+        "dietary": [
+            {"restriction": bucket, "responses": int(row["count"]), "guests": int(row["sum"])}
+            for bucket, row in dietary.iterrows()
+        ]
+    }
+
+def contribution_report(frame: pd.DataFrame) -> dict:
+    """Completed contribution totals by day and by currency"""
+    completed = frame[frame["payment_status"] == "completed"]
+    amounts = pd.to_numeric(completed["amount"], errors="coerce").fillna(0.0)
+    currencies = completed["currency"].fillna("inr").astype(str).str.lower()
+    days = _days(completed["created_at"])
+
+    by_currency = amounts.groupby(currencies).agg(["sum", "count"])
+    by_day = (
+        pd.DataFrame({"day": days, "currency": currencies, "amount": amounts})
+        .dropna(subset=["day"])
+        .groupby(["day", "currency"])["amount"]
+        .agg(["sum", "count"])
+        .sort_index()
+    )
+
+    return {
+        "by_currency": [
+            {"currency": currency, "total_amount": round(float(row["sum"]), 2), "count": int(row["count"])}
+            for currency, row in by_currency.iterrows()
+        ],
+        "by_day": [
+            {"day": _day_label(day), "currency": currency, "total_amount": round(float(row["sum"]), 2), "count": int(row["count"])}
+            for (day, currency), row in by_day.iterrows()
+        ]
+    }
+
+def fleet_report(rsvps: pd.DataFrame, contributions: pd.DataFrame) -> dict:
+    """Platform-wide RSVP and contribution rollups, including per-wedding distribution"""
+    guest_count = pd.to_numeric(rsvps["guest_count"], errors="coerce").fillna(1)
+    per_wedding = pd.DataFrame({
+        "wedding_id": rsvps["wedding_id"],
+        "responses": 1,
+        "attending": (rsvps["attendance"] == "yes").astype(np.int64),
+        "attending_guests": guest_count.where(rsvps["attendance"] == "yes", 0)
+    }).groupby("wedding_id").sum()
+
+    daily_rsvps = _days(rsvps["submitted_at"]).value_counts().sort_index()
+
+    report = rsvp_report(rsvps)
+    report.pop("response_timeline")
+    return {
+        "weddings_with_rsvps": int(len(per_wedding)),
+        "rsvps": report,
+        "rsvps_by_day": [{"day": _day_label(day), "responses": int(count)} for day, count in daily_rsvps.items()],
+        "responses_per_wedding": {
+            "mean": round(float(per_wedding["responses"].mean()), 2) if len(per_wedding) else 0.0,
+            "median": float(per_wedding["responses"].median()) if len(per_wedding) else 0.0,
+            "p90": float(per_wedding["responses"].quantile(0.9)) if len(per_wedding) else 0.0
+        },
+        "attending_guests_per_wedding": {
+            "mean": round(float(per_wedding["attending_guests"].mean()), 2) if len(per_wedding) else 0.0,
+            "max": int(per_wedding["attending_guests"].max()) if len(per_wedding) else 0
+        },
+        "contributions": contribution_report(contributions)
+    }
+
+class ReportCache:
+    """Small LRU of computed reports, each tagged with the input version it was built from"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, version, report):
+        self._entries[key] = (version, report)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+report_cache = ReportCache()
@@ -0,0 +1,217 @@
+"""
+ASGI response compression (Brotli / gzip)
+
+Compresses compressible responses at or above a size threshold using the
+best encoding the client accepts. Responses that are already encoded
+(precompressed static assets, share pages, gzip CSV exports) and event
+streams pass through untouched. Whole-body responses whose exact bytes were
+seen recently (cached feeds, reports) reuse the previously compressed
+bytes; streaming responses are compressed chunk by chunk with a flush after
+each, so nothing is buffered. CPU time spent compressing and bytes saved
+are tracked for the metrics endpoint.
+"""
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+
+from services.static_assets import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml", "image/svg+xml"
+)
+SKIPPED_TYPES = ("text/event-stream",)
+
+class CompressionStats:
+    """Counters for compressed responses"""
+
+    def __init__(self):
+        self.responses = 0
+        self.streamed_responses = 0
+        self.reused = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        saved_kb = max(self.bytes_in - self.bytes_out, 0) / 1024
+        return {
+            "responses": self.responses,
+            "streamed_responses": self.streamed_responses,
+            "reused": self.reused,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "cpu_ms_per_kb_saved": round(self.cpu_seconds * 1000 / saved_kb, 6) if saved_kb else None
+        }
+
+class _Encoder:
+    """Incremental compressor for one response"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            return out + (self._compressor.finish() if final else self._compressor.flush())
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """Negotiated Brotli/gzip compression for HTTP responses"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 reuse_max_bytes: int = 8 * 1024 * 1024, stats: CompressionStats = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.reuse_max_bytes = reuse_max_bytes
+        self.stats = stats if stats is not None else CompressionStats()
+        self._reuse = OrderedDict()
+        self._reuse_bytes = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        accepted = accepted_encodings(accept_encoding)
+        if "br" in accepted and brotli is not None:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            return await self.app(scope, receive, send)
+
+        state = {"start": None, "encoder": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                state["passthrough"] = not self._should_compress(message)
+                if state["passthrough"]:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+
+            if state["encoder"] is None:
+                if not more_body:
+                    # Whole body in one message
+                    if len(body) < self.minimum_size:
+                        state["passthrough"] = True
+                        await send(start)
+                        return await send(message)
+                    compressed = self._compress_whole(encoding, body)
+                    await send(self._encoded_start(start, encoding, len(compressed)))
+                    return await send({"type": "http.response.body", "body": compressed})
+
+                # Streaming: compress incrementally without a Content-Length
+                self.stats.streamed_responses += 1
+                self.stats.responses += 1
+                state["encoder"] = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+                await send(self._encoded_start(start, encoding, None))
+
+            await send({
+                "type": "http.response.body",
+                "body": self._timed(state["encoder"].compress, body, not more_body),
+                "more_body": more_body
+            })
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, start: dict) -> bool:
+        if start.get("status", 200) in (204, 206, 304) or start.get("status", 200) < 200:
+            return False
+        content_type = ""
+        for name, value in start.get("headers", []):
+            name = name.lower()
+            if name == b"content-encoding":
+                # Already encoded upstream (precompressed or self-compressing)
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+            if name == b"content-length" and int(value) < self.minimum_size:
+                return False
+        if content_type.startswith(SKIPPED_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _compress_whole(self, encoding: str, body: bytes) -> bytes:
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self._reuse.get(key)
+        if compressed is not None:
+            self._reuse.move_to_end(key)
+            self.stats.reused += 1
+            self.stats.bytes_in += len(body)
+            self.stats.bytes_out += len(compressed)
+        else:
+            compressed = self._timed(_Encoder(encoding, self.gzip_level, self.brotli_quality).compress, body, True)
+            self._remember(key, compressed)
+        self.stats.responses += 1
+        return compressed
+
+    def _timed(self, compress, body: bytes, final: bool) -> bytes:
+        started = time.thread_time()
+        compressed = compress(body, final)
+        self.stats.cpu_seconds += time.thread_time() - started
+        self.stats.bytes_in += len(body)
+        self.stats.bytes_out += len(compressed)
+        return compressed
+
+    def _remember(self, key, compressed: bytes):
+        if len(compressed) > self.reuse_max_bytes // 8:
+            return
+        self._reuse[key] = compressed
+        self._reuse_bytes += len(compressed)
+        while self._reuse_bytes > self.reuse_max_bytes:
+            _, evicted = self._reuse.popitem(last=False)
+            self._reuse_bytes -= len(evicted)
+
+    @staticmethod
+    def _encoded_start(start: dict, encoding: str, content_length) -> dict:
+        headers = []
+        vary = None
+        for name, value in start.get("headers", []):
+            lowered = name.lower()
+            if lowered == b"content-length":
+                continue
+            if lowered == b"vary":
+                vary = value
+                continue
+            headers.append((name, value))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        headers.append((b"content-encoding", encoding.encode()))
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif b"accept-encoding" not in vary.lower():
+            vary = vary + b", Accept-Encoding"
+        headers.append((b"vary", vary))
+        # Strong validators describe the uncompressed bytes
+        headers = [
+            (name, b"W/" + value if name.lower() == b"etag" and not value.startswith(b"W/") else value)
+            for name, value in headers
+        ]
+        return {**start, "headers": headers}
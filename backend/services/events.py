@@ -0,0 +1,87 @@
+"""
+In-process pub/sub broker for per-wedding Server-Sent Events
+
+Writers publish small change notifications ("rsvp.created",
+"guestbook.created", ...) to a wedding's topic; connected dashboards and
+wedding pages receive them over SSE and refetch only what changed. Each
+connection owns a bounded queue: a subscriber that falls behind gets its
+backlog replaced by a single "resync" event instead of growing without
+limit. Idle connections cost one pending queue read; a periodic heartbeat
+keeps proxies from timing them out and surfaces dead sockets so they are
+cleaned up.
+"""
+import asyncio
+import itertools
+import json
+from collections import defaultdict
+
+class Subscription:
+    """One connected client's view of a topic"""
+
+    __slots__ = ("topic", "queue")
+
+    def __init__(self, topic: str, max_queue: int):
+        self.topic = topic
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+class EventBroker:
+    """Fan-out of published events to per-topic subscribers"""
+
+    def __init__(self, max_queue: int = 64, heartbeat_interval: float = 15.0):
+        self.max_queue = max_queue
+        self.heartbeat_interval = heartbeat_interval
+        self._topics = defaultdict(set)
+        self._event_ids = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._topics.values())
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(topic, self.max_queue)
+        self._topics[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._topics.get(subscription.topic)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[subscription.topic]
+
+    def publish(self, topic: str, event_type: str, data: dict = None):
+        """Queue an event for every subscriber of topic (never blocks)"""
+        subscribers = self._topics.get(topic)
+        if not subscribers:
+            return
+        # Encode once, share the bytes across all subscribers
+        message = self._encode(event_type, data or {})
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._resync(subscription)
+
+    def _encode(self, event_type: str, data: dict) -> bytes:
+        payload = json.dumps({"type": event_type, **data}, default=str)
+        return f"id: {next(self._event_ids)}\nevent: {event_type}\ndata: {payload}\n\n".encode()
+
+    def _resync(self, subscription: Subscription):
+        """Replace a slow subscriber's backlog with one 'refetch everything' event"""
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(self._encode("resync", {}))
+
+    async def stream(self, topic: str):
+        """Async iterator of SSE frames for one connection; unsubscribes on exit"""
+        subscription = self.subscribe(topic)
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    message = b": heartbeat\n\n"
+                yield message
+        finally:
+            self.unsubscribe(subscription)
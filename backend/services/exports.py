@@ -0,0 +1,61 @@
+"""
+Streaming CSV exports
+
+Rows are pulled from an async Mongo cursor, encoded a chunk at a time and
+(optionally) gzip-compressed incrementally, so an export never holds the
+full result set in memory and the header row is sent before the first
+database batch arrives.
+"""
+import csv
+import io
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+CURSOR_BATCH_SIZE = 1000
+
+# Leading characters that spreadsheet apps treat as formulas
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """True when the Accept-Encoding header allows gzip"""
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+async def stream_csv(cursor, columns: list, headers: list = None, compress: bool = False):
+    """Yield CSV bytes for every document from cursor, optionally as a gzip stream"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def drain(final: bool = False) -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+        if compressor is None:
+            return data
+        # Sync-flush every chunk so the client can decode what it has received
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    # BOM so spreadsheet apps detect UTF-8, then the header row straight away
+    buffer.write("\ufeff")
+    writer.writerow(headers or columns)
+    yield drain()
+
+    async for doc in cursor.batch_size(CURSOR_BATCH_SIZE):
+        writer.writerow([_cell(doc.get(column)) for column in columns])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield drain()
+
+    tail = drain(final=True)
+    if tail:
+        yield tail
@@ -0,0 +1,154 @@
+"""
+Idempotency-Key support for side-effecting endpoints
+
+The first request with a given key runs the handler; concurrent duplicates
+(in this worker or another) wait for that result instead of running it
+again, and later retries within the TTL replay the stored response. Results
+are kept in a small in-memory cache in front of a MongoDB collection whose
+TTL index expires them. A key reused with a different request body is
+rejected rather than silently replaying an unrelated response.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+MAX_KEY_LENGTH = 255
+
+class IdempotencyError(Exception):
+    """Base class for idempotency failures"""
+
+class IdempotencyConflict(IdempotencyError):
+    """The key was already used with a different request body"""
+
+class IdempotencyInProgress(IdempotencyError):
+    """The original request with this key has not finished"""
+
+def fingerprint(payload) -> str:
+    """Stable hash of a JSON-serializable request body"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+class IdempotencyStore:
+    """Single-flight execution and response replay keyed by (scope, Idempotency-Key)"""
+
+    def __init__(self, ttl: float = 3600.0, max_memory_entries: int = 10000,
+                 wait_timeout: float = 30.0, poll_interval: float = 0.1):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.collection = None
+        self._memory = OrderedDict()
+        self._inflight = {}
+
+    def attach(self, collection):
+        """Use collection (with a TTL index on created_at) to share keys across workers"""
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("created_at", expireAfterSeconds=int(self.ttl))
+
+    async def run(self, scope: str, key: str, request_fingerprint: str, handler):
+        """Return (response, replayed) for this key, running handler at most once"""
+        if len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+        full_key = f"{scope}:{key}"
+
+        cached = self._memory_get(full_key)
+        if cached is not None:
+            return self._check(cached, request_fingerprint), True
+
+        inflight = self._inflight.get(full_key)
+        if inflight is not None:
+            # Duplicate racing the original in this worker
+            entry = await asyncio.shield(inflight)
+            return self._check(entry, request_fingerprint), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            entry, replayed = await self._execute(full_key, request_fingerprint, handler)
+            future.set_result(entry)
+            return self._check(entry, request_fingerprint), replayed
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self._inflight[full_key]
+
+    async def _execute(self, full_key: str, request_fingerprint: str, handler):
+        if self.collection is None:
+            entry = {"fingerprint": request_fingerprint, "response": await handler()}
+            self._memory_put(full_key, entry)
+            return entry, False
+
+        try:
+            await self.collection.insert_one({
+                "_id": full_key,
+                "fingerprint": request_fingerprint,
+                "state": "in_progress",
+                "created_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            # Another worker claimed the key first
+            return await self._wait_for_result(full_key), True
+
+        try:
+            response = await handler()
+        except BaseException:
+            # Release the key so a retry can run the request again
+            await self.collection.delete_one({"_id": full_key, "state": "in_progress"})
+            raise
+
+        entry = {"fingerprint": request_fingerprint, "response": response}
+        await self.collection.update_one(
+            {"_id": full_key},
+            {"$set": {"state": "done", "response": response}}
+        )
+        self._memory_put(full_key, entry)
+        return entry, False
+
+    async def _wait_for_result(self, full_key: str) -> dict:
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            doc = await self.collection.find_one({"_id": full_key})
+            if doc is None:
+                # The original failed and released the key
+                raise IdempotencyInProgress("The original request failed; retry with the same key")
+            if doc.get("state") == "done":
+                entry = {"fingerprint": doc["fingerprint"], "response": doc["response"]}
+                self._memory_put(full_key, entry)
+                return entry
+            if doc.get("state") == "in_progress" and time.monotonic() >= deadline:
+                raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+    @staticmethod
+    def _check(entry: dict, request_fingerprint: str):
+        if entry["fingerprint"] != request_fingerprint:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+        return entry["response"]
+
+    def _memory_get(self, full_key: str):
+        item = self._memory.get(full_key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.monotonic():
+            del self._memory[full_key]
+            return None
+        self._memory.move_to_end(full_key)
+        return entry
+
+    def _memory_put(self, full_key: str, entry: dict):
+        self._memory[full_key] = (time.monotonic() + self.ttl, entry)
+        self._memory.move_to_end(full_key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,102 @@
+"""
+Minimal wedding identity lookups
+
+Most handlers only need to know that a wedding exists, what its id is and
+who owns it, yet a wedding document can carry megabytes of inline images.
+WeddingDirectory resolves an id, shareable_id, owner user id or username to
+{id, user_id, shareable_id, updated_at}. Each lookup key has a compound
+index holding all four fields, so the queries are covered (answered from
+the index without reading the document), and results sit in a small TTL
+cache. Writes in this worker invalidate immediately; other workers' writes
+only change updated_at, which may be up to ttl seconds stale.
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+IDENTITY_FIELDS = ("id", "user_id", "shareable_id", "updated_at")
+IDENTITY_PROJECTION = {"_id": 0, **{field: 1 for field in IDENTITY_FIELDS}}
+LOOKUP_FIELDS = ("id", "shareable_id", "user_id")
+
+def identity_index(field: str) -> list:
+    """Compound index keys that cover an identity lookup by field"""
+    return [(field, 1)] + [(other, 1) for other in IDENTITY_FIELDS if other != field]
+
+class WeddingDirectory:
+    """Covered-index wedding identity lookups behind a TTL cache"""
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.weddings = None
+        self.users = None
+        # (field, value) -> (identity record, expires at)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, weddings, users):
+        self.weddings = weddings
+        self.users = users
+
+    async def ensure_indexes(self):
+        for field in LOOKUP_FIELDS:
+            await self.weddings.create_index(identity_index(field))
+        await self.users.create_index([("username", 1), ("id", 1)])
+
+    async def by_id(self, wedding_id: str) -> Optional[dict]:
+        return await self._lookup("id", wedding_id)
+
+    async def by_shareable_id(self, shareable_id: str) -> Optional[dict]:
+        return await self._lookup("shareable_id", shareable_id)
+
+    async def by_user_id(self, user_id: str) -> Optional[dict]:
+        return await self._lookup("user_id", user_id)
+
+    async def by_username(self, username: str) -> Optional[dict]:
+        record = self._cached(("username", username))
+        if record is not None:
+            return record
+        user = await self.users.find_one({"username": username}, {"_id": 0, "id": 1})
+        if user is None:
+            return None
+        record = await self.by_user_id(user["id"])
+        if record is not None:
+            self._put(("username", username), record)
+        return record
+
+    def invalidate(self, wedding_id: str):
+        """Forget every key that resolved to wedding_id"""
+        for key in [key for key, (record, _) in self._entries.items() if record["id"] == wedding_id]:
+            del self._entries[key]
+
+    async def _lookup(self, field: str, value) -> Optional[dict]:
+        if not value or not isinstance(value, str):
+            return None
+        record = self._cached((field, value))
+        if record is not None:
+            return record
+        record = await self.weddings.find_one({field: value}, IDENTITY_PROJECTION)
+        if record is not None:
+            # Misses are not cached, so a newly created wedding resolves right away
+            for lookup_field in LOOKUP_FIELDS:
+                if record.get(lookup_field):
+                    self._put((lookup_field, record[lookup_field]), record)
+        return record
+
+    def _cached(self, key: tuple) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def _put(self, key: tuple, record: dict):
+        self._entries[key] = (record, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,323 @@
+"""
+In-process metrics in Prometheus text format
+
+A deliberately small registry (counters, gauges, fixed-bucket histograms)
+so the hot path is a tuple-keyed dict update and a bisect, with no
+dependencies. Values that already live elsewhere (cache counters, queue
+sizes, job stats) are read by collectors at scrape time rather than
+mirrored on every change.
+
+Wiring:
+  * MetricsMiddleware - request count, latency and in-flight requests per
+    (method, route template); the one per-request wrapper
+  * InstrumentedRoute - route that caches its metric cells, built once per route
+  * MongoCommandMetrics - pymongo CommandListener, passed to the Motor client
+  * EventLoopLagMonitor - how late the event loop wakes a sleeping task
+"""
+import asyncio
+import bisect
+import threading
+import time
+
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def inc_labels(self, labels: tuple, amount: float = 1):
+        """inc() with a prebuilt label tuple"""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def inc_labels(self, labels: tuple, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS,
+                 threadsafe: bool = False):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Only needed when observed from worker threads (pymongo listeners)
+        self._lock = threading.Lock() if threadsafe else None
+
+    def observe(self, value: float, *labels):
+        if self._lock is not None:
+            with self._lock:
+                self._observe(value, labels)
+        else:
+            self._observe(value, labels)
+
+    def _observe(self, value: float, labels: tuple):
+        state = self.cell(labels)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def cell(self, labels: tuple) -> list:
+        """Mutable state for one label set: per-bucket (non-cumulative) counts, +Inf last, then the sum"""
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        return state
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for labels, state in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Owns metrics and scrape-time collectors; renders the exposition text"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), **kwargs) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() returns metrics (usually fresh Gauges/Counters) to render on each scrape"""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for metric in collect():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# id(scope) -> scope of every request being handled; the route each one matched is
+# read from its scope at scrape time, so tracking costs one dict insert and delete
+_in_flight = {}
+
+# (method, route template, status) -> latency histogram state. The request counter
+# and the per-route histogram are both summed from these at scrape time, so a
+# request updates one list
+_request_cells = {}
+
+# Cell caches for requests that did not match an InstrumentedRoute, by template
+_unrouted_cells = {}
+
+# Hot-path aliases for MetricsMiddleware
+_perf_counter = time.perf_counter
+_bisect = bisect.bisect_left
+_latency_buckets = DEFAULT_BUCKETS
+
+def _metric_cell(route, method: str, status_code: int) -> list:
+    """Latency histogram state for a response, cached on the route"""
+    template = getattr(route, "path", None) or "unmatched"
+    cache = getattr(route, "metric_cells", None)
+    if cache is None:
+        # Plain routes, mounts and unmatched requests share one cache per template
+        cache = _unrouted_cells.setdefault(template, {})
+    cell = cache.get((method, status_code))
+    if cell is None:
+        cell = cache[(method, status_code)] = _request_cells.setdefault(
+            (method, template, str(status_code)), [0] * (len(_latency_buckets) + 1) + [0.0]
+        )
+    return cell
+
+class MetricsMiddleware:
+    """Count, time and track in-flight HTTP requests by their route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = _perf_counter()
+        status_code = 500
+
+        # A plain function returning send's awaitable: no extra coroutine per message
+        def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            return send(message)
+
+        request_id = id(scope)
+        _in_flight[request_id] = scope
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = _perf_counter() - started
+            del _in_flight[request_id]
+            # The router stores the matched route in the (shared) scope. Recording is inlined
+            # (this runs on every request): a cached cell lookup, a bisect and two list updates
+            try:
+                cell = scope["route"].metric_cells[scope["method"], status_code]
+            except (KeyError, AttributeError):
+                cell = _metric_cell(scope.get("route"), scope["method"], status_code)
+            cell[_bisect(_latency_buckets, elapsed)] += 1
+            cell[-1] += elapsed
+
+def _collect_http() -> list:
+    requests = Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+    duration = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+    in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled", ("method", "route"))
+    for (method, template, status), cell in list(_request_cells.items()):
+        cell = list(cell)
+        requests.inc_labels((method, template, status), sum(cell[:-1]))
+        state = duration.cell((method, template))
+        for i, value in enumerate(cell):
+            state[i] += value
+    for scope in list(_in_flight.values()):
+        in_flight.inc(scope["method"], getattr(scope.get("route"), "path", None) or "unmatched")
+    return [requests, duration, in_flight]
+
+registry.add_collector(_collect_http)
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that caches its metric cells, so recording a request builds no labels"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (method, status) -> latency histogram state in _request_cells
+        self.metric_cells = {}
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Latency of every MongoDB command by collection and command name"""
+
+    def __init__(self, metrics: MetricsRegistry = registry):
+        self.duration = metrics.histogram(
+            "mongodb_command_duration_seconds", "MongoDB command latency", ("collection", "command"), threadsafe=True
+        )
+        self.failures = metrics.counter("mongodb_command_failures_total", "Failed MongoDB commands", ("collection", "command"))
+        # request_id -> collection, filled at start since completion events lack the command body
+        self._collections = {}
+
+    def started(self, event):
+        # getMore names the collection separately from its cursor id
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        self.duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        self.duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+        self.failures.inc(collection, event.command_name)
+
+class EventLoopLagMonitor:
+    """Measures how much later than requested the loop resumes a sleeping task"""
+
+    def __init__(self, interval: float = 0.5, metrics: MetricsRegistry = registry):
+        self.interval = interval
+        self.lag = metrics.gauge("event_loop_lag_seconds", "Most recent event loop scheduling delay")
+        self.lag_histogram = metrics.histogram(
+            "event_loop_lag_distribution_seconds", "Event loop scheduling delay",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+        )
+        self._task = None
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - started - self.interval, 0.0)
+            self.lag.set(lag)
+            self.lag_histogram.observe(lag)
+
+def snapshot_gauges(prefix: str, documentation: str, values: dict, labelnames: tuple = ()) -> list:
+    """Metrics for a dict of name -> value (or name -> {labels: value}) read at scrape time
+
+    Names ending in _total are cumulative and exported as counters; the rest as gauges.
+    """
+    metrics = []
+    for key, value in values.items():
+        if value is None or isinstance(value, str):
+            continue
+        metric_class = Counter if key.endswith("_total") else Gauge
+        metric = metric_class(f"{prefix}_{key}", f"{documentation} ({key})", labelnames)
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, labelled_value in items:
+            # A fresh metric per scrape, so inc from zero sets the value
+            metric.inc_labels(labels if isinstance(labels, tuple) else (labels,), amount=labelled_value)
+        metrics.append(metric)
+    return metrics
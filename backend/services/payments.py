@@ -0,0 +1,116 @@
+"""
+Non-blocking Stripe gateway
+
+The Stripe SDK is synchronous, so every call runs on a small dedicated
+thread pool instead of the event loop. One pooled requests.Session gives
+keep-alive connection reuse across calls; each call has an HTTP timeout
+plus an overall deadline, and transient failures (connection errors, rate
+limits, 5xx, timeouts) are retried with full-jitter exponential backoff.
+Every create carries an idempotency key so retries never double-charge.
+
+The Stripe SDK (and requests) take a noticeable share of worker start-up
+time to import, so they are loaded on the first payment call, inside the
+worker thread that makes it, rather than when this module is imported.
+
+Point STRIPE_API_BASE at tools/fake_stripe.py to exercise payments offline.
+"""
+import asyncio
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.tracing import span
+
+class PaymentGatewayError(Exception):
+    """A payment provider call failed (after retries, where retrying applies)"""
+
+def _is_retryable(error: Exception) -> bool:
+    """Transient Stripe failures: connection errors, rate limits and 5xx"""
+    import stripe
+    return isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError, stripe.error.APIError))
+
+class StripeGateway:
+    """Async facade over the Stripe SDK with a bounded worker pool"""
+
+    def __init__(self, api_key: str, api_base: str = None, max_workers: int = 8,
+                 timeout: float = 10.0, max_retries: int = 2, backoff_base: float = 0.25):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        # Threads are only spawned when the first call is submitted
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stripe")
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._client is not None
+
+    def _stripe_client(self):
+        """The StripeClient, built on first use (runs in a worker thread)"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import requests
+                    import stripe
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+
+                    self._client = stripe.StripeClient(
+                        self.api_key or "",
+                        http_client=stripe.RequestsClient(timeout=self.timeout, session=session),
+                        base_addresses={"api": self.api_base} if self.api_base else {},
+                        # Retries are handled here, with jitter and an overall deadline
+                        max_network_retries=0
+                    )
+        return self._client
+
+    async def _call(self, operation: str, request):
+        """Run request(client) on the pool with retries; request is a function of the StripeClient"""
+        loop = asyncio.get_running_loop()
+        call = lambda: request(self._stripe_client())
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Small grace period over the HTTP timeout for pool queueing
+                with span(f"stripe.{operation}", "http", attempt=attempt):
+                    return await asyncio.wait_for(loop.run_in_executor(self._executor, call), self.timeout + 1)
+            except Exception as e:
+                if not isinstance(e, asyncio.TimeoutError) and not _is_retryable(e):
+                    import stripe
+                    if isinstance(e, stripe.error.StripeError):
+                        raise PaymentGatewayError(e.user_message or str(e)) from e
+                    raise
+                if attempt == self.max_retries:
+                    raise PaymentGatewayError(str(e) or "Payment provider timed out") from e
+                await asyncio.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+
+    async def create_payment_intent(self, params: dict, idempotency_key: str = None):
+        """Create a PaymentIntent; the idempotency key makes retries safe"""
+        options = {"idempotency_key": idempotency_key or str(uuid.uuid4())}
+        return await self._call(
+            "payment_intents.create", lambda client: client.v1.payment_intents.create(params=params, options=options)
+        )
+
+    async def retrieve_payment_intent(self, payment_intent_id: str):
+        return await self._call(
+            "payment_intents.retrieve", lambda client: client.v1.payment_intents.retrieve(payment_intent_id)
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+def parse_webhook_event(payload: bytes, signature_header: str, secret: str):
+    """Verify a Stripe webhook signature and return the decoded event (imports stripe; call off the loop)"""
+    import stripe
+    try:
+        return stripe.Webhook.construct_event(payload, signature_header, secret)
+    except (ValueError, stripe.error.SignatureVerificationError) as e:
+        raise PaymentGatewayError(f"Invalid webhook: {e}") from e
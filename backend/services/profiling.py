@@ -0,0 +1,170 @@
+"""
+On-demand CPU and memory profiling for a live worker
+
+CpuSampler periodically reads every thread's current frame from a
+background thread (sys._current_frames) for a bounded duration and
+aggregates the stacks into collapsed "frame;frame;frame count" lines, the
+input format of flamegraph.pl, speedscope and most flamegraph viewers.
+MemoryProfiler wraps tracemalloc: start tracing, take snapshots grouped by
+allocation site, and diff them against the baseline taken at start.
+
+Nothing runs until an operator asks: no sampler thread exists between
+profiles, and tracemalloc is only enabled between start() and stop() (or
+until its time limit passes). Only one CPU profile runs at a time.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+MAX_CPU_SECONDS = 60.0
+MIN_INTERVAL_SECONDS = 0.001
+MAX_STACK_DEPTH = 128
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this worker"""
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class CpuSampler:
+    """Time-boxed sampling profiler producing collapsed stacks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def profile(self, seconds: float, interval: float = 0.01, all_threads: bool = False) -> dict:
+        """Sample for seconds (blocking; run it off the event loop)"""
+        seconds = min(max(seconds, 0.1), MAX_CPU_SECONDS)
+        interval = max(interval, MIN_INTERVAL_SECONDS)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A CPU profile is already running")
+        try:
+            return self._sample(seconds, interval, all_threads)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float, all_threads: bool) -> dict:
+        me = threading.get_ident()
+        main = threading.main_thread().ident
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (not all_threads and ident != main):
+                    continue
+                labels = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            time.sleep(interval)
+        return {"samples": samples, "interval": interval, "seconds": seconds, "stacks": stacks}
+
+    @staticmethod
+    def collapsed(profile: dict) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].most_common())
+
+    @staticmethod
+    def speedscope(profile: dict, name: str = "cpu profile") -> dict:
+        """The same samples as a speedscope 'sampled' profile (open at speedscope.app)"""
+        frames, index, samples, weights = [], {}, [], []
+        for stack, count in profile["stacks"].items():
+            sample = []
+            for label in stack.split(";"):
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                sample.append(index[label])
+            samples.append(sample)
+            weights.append(count * profile["interval"])
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+class MemoryProfiler:
+    """tracemalloc snapshots and diffs, enabled only on demand"""
+
+    GROUP_BY = ("lineno", "filename", "traceback")
+
+    def __init__(self):
+        self.baseline = None
+        self.started_at = None
+        self._stop_handle = None
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10, max_seconds: float = 900.0):
+        """Begin tracing allocations; stops by itself after max_seconds"""
+        if self.active:
+            raise ProfilerBusy("Memory tracing is already running")
+        tracemalloc.start(max(1, min(frames, 50)))
+        self.started_at = time.time()
+        self.baseline = self._filtered(tracemalloc.take_snapshot())
+        self._stop_handle = asyncio.get_running_loop().call_later(max_seconds, self.stop)
+
+    def stop(self):
+        if self._stop_handle is not None:
+            self._stop_handle.cancel()
+            self._stop_handle = None
+        tracemalloc.stop()
+        self.baseline = None
+        self.started_at = None
+
+    def report(self, limit: int = 25, group_by: str = "lineno") -> dict:
+        """Top allocation sites now, and growth since start (blocking; run it off the event loop)"""
+        if group_by not in self.GROUP_BY:
+            raise ValueError(f"group_by must be one of: {', '.join(self.GROUP_BY)}")
+        snapshot = self._filtered(tracemalloc.take_snapshot())
+        current, peak = tracemalloc.get_traced_memory()
+        top = snapshot.statistics(group_by)[:limit]
+        report = {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "tracing_seconds": round(time.time() - self.started_at, 1) if self.started_at else None,
+            "top": [self._stat(stat) for stat in top]
+        }
+        if self.baseline is not None:
+            growth = snapshot.compare_to(self.baseline, group_by)[:limit]
+            report["growth_since_start"] = [
+                {**self._stat(stat), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in growth
+            ]
+        return report
+
+    @staticmethod
+    def _filtered(snapshot):
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ))
+
+    @staticmethod
+    def _stat(stat) -> dict:
+        return {
+            "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size": stat.size,
+            "count": stat.count
+        }
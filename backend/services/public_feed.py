@@ -0,0 +1,142 @@
+"""
+In-memory feed of the newest public guestbook messages
+
+The landing page only shows the latest few dozen public messages, so each
+worker keeps them in a bounded ring buffer and serves the response as
+pre-encoded JSON. The buffer is seeded from MongoDB at startup, appended to
+by local writes, and kept in step with other workers through a change
+stream (or index-backed polling when change streams are unavailable).
+"""
+import asyncio
+import bisect
+import json
+import logging
+from collections import deque
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from utils.pagination import encode_cursor
+
+logger = logging.getLogger(__name__)
+
+SORT_FIELDS = ("created_at", "id")
+NEWEST_FIRST = [(field, -1) for field in SORT_FIELDS]
+
+def _sort_key(message: dict) -> tuple:
+    return tuple(str(message.get(field) or "") for field in SORT_FIELDS)
+
+class PublicFeed:
+    """Ring buffer of the newest public guestbook messages, oldest first"""
+
+    def __init__(self, size: int = 50, poll_interval: float = 5.0):
+        self.size = size
+        self.poll_interval = poll_interval
+        self.seeded = False
+        self._messages = deque(maxlen=size)
+        self._ids = set()
+        self._has_older = False
+        self._encoded = {}
+        self._watch_task = None
+
+    async def seed(self, collection):
+        """Load the newest messages from MongoDB, replacing the buffer contents"""
+        cursor = collection.find({"is_public": True}, {"_id": 0}).sort(NEWEST_FIRST).limit(self.size + 1)
+        newest = await cursor.to_list(length=self.size + 1)
+        self._messages.clear()
+        self._ids.clear()
+        self._has_older = len(newest) > self.size
+        for message in reversed(newest[:self.size]):
+            self._messages.append(message)
+            self._ids.add(message["id"])
+        self._encoded.clear()
+        self.seeded = True
+
+    def add(self, message: dict):
+        """Insert a public message (idempotent per message id)"""
+        if not message.get("is_public") or message.get("id") in self._ids:
+            return
+        message = {k: v for k, v in message.items() if k != "_id"}
+        key = _sort_key(message)
+
+        if len(self._messages) == self.size:
+            if key <= _sort_key(self._messages[0]):
+                # Older than everything we keep
+                self._has_older = True
+                return
+            evicted = self._messages.popleft()
+            self._ids.discard(evicted["id"])
+            self._has_older = True
+
+        if not self._messages or key >= _sort_key(self._messages[-1]):
+            self._messages.append(message)
+        else:
+            # Out-of-order arrival from another worker
+            position = bisect.bisect_right([_sort_key(m) for m in self._messages], key)
+            self._messages.insert(position, message)
+        self._ids.add(message["id"])
+        self._encoded.clear()
+
+    def encoded_page(self, limit: int) -> bytes:
+        """JSON body for the first page of limit messages, newest first"""
+        body = self._encoded.get(limit)
+        if body is None:
+            newest = list(reversed(self._messages))
+            page = newest[:limit]
+            has_more = len(newest) > limit or self._has_older
+            next_cursor = encode_cursor(*(page[-1].get(field) for field in SORT_FIELDS)) if has_more and page else None
+            body = json.dumps({
+                "success": True,
+                "messages": page,
+                "total_count": len(page),
+                "next_cursor": next_cursor,
+                "has_more": has_more
+            }, default=str).encode()
+            self._encoded[limit] = body
+        return body
+
+    def start(self, collection):
+        """Begin following public inserts made by other workers"""
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._follow(collection))
+
+    async def stop(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _follow(self, collection):
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.is_public": True}}]
+        while True:
+            try:
+                async with collection.watch(pipeline) as stream:
+                    async for change in stream:
+                        self.add(change["fullDocument"])
+            except OperationFailure as e:
+                # Standalone servers do not support change streams
+                logger.info(f"Public feed change stream unavailable ({e}); polling every {self.poll_interval}s")
+                break
+            except PyMongoError as e:
+                logger.warning(f"Public feed change stream interrupted: {e}")
+                await asyncio.sleep(self.poll_interval)
+                try:
+                    # Pick up anything inserted while we were disconnected
+                    await self.seed(collection)
+                except PyMongoError:
+                    pass
+        await self._poll(collection)
+
+    async def _poll(self, collection):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                newest = self._messages[-1].get("created_at") if self._messages else ""
+                query = {"is_public": True, "created_at": {"$gte": newest}}
+                cursor = collection.find(query, {"_id": 0}).sort(NEWEST_FIRST).limit(self.size)
+                async for message in cursor:
+                    self.add(message)
+            except PyMongoError as e:
+                logger.warning(f"Public feed poll failed: {e}")
@@ -0,0 +1,194 @@
+"""
+Background sweeper for contributions stuck in "pending"
+
+Browsers that never come back to /api/payment/confirm (and webhooks that
+never arrive) leave Stripe contributions pending forever. The sweeper walks
+stale pending rows in (created_at, id) order through an index, looks their
+PaymentIntents up in parallel with a concurrency cap, and applies the
+resulting transitions through the same settle() helper the webhook uses
+(totals, data versions, live events). Progress is checkpointed in MongoDB
+so a restarted worker resumes mid-pass, and a lease, renewed before every
+batch and backoff, keeps concurrent workers from sweeping at the same time.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from services.payments import PaymentGatewayError
+
+logger = logging.getLogger(__name__)
+
+JOB_ID = "pending_contributions"
+
+class PendingContributionSweeper:
+    """Resolves stale pending Stripe contributions against their PaymentIntents"""
+
+    def __init__(self, database, gateway, settle, interval: float = 300.0, stale_after: float = 1800.0,
+                 abandon_after: float = 86400.0, batch_size: int = 100, concurrency: int = 4,
+                 max_backoff: float = 300.0):
+        self.database = database
+        self.gateway = gateway
+        self.settle = settle
+        self.interval = interval
+        self.stale_after = stale_after
+        self.abandon_after = abandon_after
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_backoff = max_backoff
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._task = None
+        self.stats = {
+            "passes_total": 0,
+            "checked_total": 0,
+            "completed_total": 0,
+            "failed_total": 0,
+            "errors_total": 0,
+            "last_batch_rows_per_second": 0.0,
+            "lag_seconds": 0.0,
+            "last_run_at": None
+        }
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._acquire_lease():
+                    await self.sweep()
+            except Exception as e:
+                self.stats["errors_total"] += 1
+                logger.error(f"Pending contribution sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _acquire_lease(self) -> bool:
+        """Claim the job for one interval so only one worker sweeps at a time"""
+        now = datetime.utcnow()
+        try:
+            claimed = await self.database.job_checkpoints.find_one_and_update(
+                {"_id": JOB_ID, "$or": [{"lease_until": {"$lt": now}}, {"lease_owner": self.owner}]},
+                {"$set": {"lease_owner": self.owner, "lease_until": now + timedelta(seconds=self.interval)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another worker holds a live lease
+            return False
+        return claimed is not None
+
+    async def _renew_lease(self, hold_for: float = 0.0) -> bool:
+        """Extend our lease to cover the next interval (plus hold_for); False if another worker took it"""
+        result = await self.database.job_checkpoints.update_one(
+            {"_id": JOB_ID, "lease_owner": self.owner},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=self.interval + hold_for)}}
+        )
+        return result.matched_count > 0
+
+    async def sweep(self):
+        """Run one pass (resuming from the checkpoint) over stale pending contributions"""
+        self.stats["last_run_at"] = datetime.utcnow().isoformat()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        base_query = {
+            "payment_status": "pending",
+            "created_at": {"$lt": cutoff},
+            "stripe_payment_intent_id": {"$nin": [None, ""]}
+        }
+
+        oldest = await self.database.contributions.find_one(base_query, {"_id": 0, "created_at": 1}, sort=[("created_at", 1)])
+        self.stats["lag_seconds"] = (datetime.utcnow() - oldest["created_at"]).total_seconds() if oldest else 0.0
+
+        checkpoint = await self.database.job_checkpoints.find_one({"_id": JOB_ID}) or {}
+        after = checkpoint.get("after")
+        backoff = 0.0
+
+        while True:
+            if not await self._renew_lease():
+                logger.warning("Pending sweep lease lost to another worker; stopping this pass")
+                return
+            query = dict(base_query)
+            if after:
+                query["$or"] = [
+                    {"created_at": {"$gt": after["created_at"]}},
+                    {"created_at": after["created_at"], "id": {"$gt": after["id"]}}
+                ]
+            batch = await self.database.contributions.find(
+                query, {"_id": 0, "id": 1, "created_at": 1, "stripe_payment_intent_id": 1}
+            ).sort([("created_at", 1), ("id", 1)]).limit(self.batch_size).to_list(length=self.batch_size)
+            if not batch:
+                break
+
+            started = time.monotonic()
+            errors = await self._process_batch(batch)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stats["last_batch_rows_per_second"] = round(len(batch) / elapsed, 2)
+
+            if errors == len(batch):
+                # Provider is struggling: back off exponentially and retry the same batch
+                backoff = min(max(backoff * 2, 1.0), self.max_backoff)
+                logger.warning(f"Pending sweep batch failed entirely; backing off {backoff:.0f}s")
+                # Keep the job while we wait so another worker does not start an overlapping pass
+                if not await self._renew_lease(hold_for=backoff):
+                    return
+                await asyncio.sleep(backoff)
+                continue
+            backoff = 0.0
+
+            # Checkpoint progress (only while the lease is still ours)
+            after = {"created_at": batch[-1]["created_at"], "id": batch[-1]["id"]}
+            await self.database.job_checkpoints.update_one(
+                {"_id": JOB_ID, "lease_owner": self.owner}, {"$set": {"after": after}}
+            )
+
+        # Pass complete - the next pass starts from the beginning
+        await self.database.job_checkpoints.update_one({"_id": JOB_ID, "lease_owner": self.owner}, {"$set": {"after": None}})
+        self.stats["passes_total"] += 1
+
+    async def _process_batch(self, batch: list) -> int:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def lookup(row):
+            async with semaphore:
+                try:
+                    return row, await self.gateway.retrieve_payment_intent(row["stripe_payment_intent_id"])
+                except PaymentGatewayError as e:
+                    logger.warning(f"Could not retrieve {row['stripe_payment_intent_id']}: {e}")
+                    return row, None
+
+        results = await asyncio.gather(*(lookup(row) for row in batch))
+
+        abandon_cutoff = datetime.utcnow() - timedelta(seconds=self.abandon_after)
+        errors = 0
+        for row, intent in results:
+            if intent is None:
+                errors += 1
+                continue
+            self.stats["checked_total"] += 1
+            # Both transitions go through settlement: totals counted exactly once, data
+            # versions bumped (cached dashboards/reports refresh) and live clients notified
+            if intent.status == "succeeded":
+                if await self.settle(row["stripe_payment_intent_id"], "completed"):
+                    self.stats["completed_total"] += 1
+            elif intent.status == "canceled" or (
+                intent.status == "requires_payment_method" and row["created_at"] < abandon_cutoff
+            ):
+                if await self.settle(row["stripe_payment_intent_id"], "failed"):
+                    self.stats["failed_total"] += 1
+
+        self.stats["errors_total"] += errors
+        return errors
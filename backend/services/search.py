@@ -0,0 +1,159 @@
+"""
+Per-wedding full-text search over guestbook messages and RSVP notes
+
+Each wedding gets an in-process inverted index, built on first query from
+projected cursors and then kept current incrementally: local writes are
+added as they happen, and before answering a query the index pulls any
+documents newer than its high-water marks (written by other workers)
+through the (wedding_id, created_at / submitted_at) indexes. Queries match
+term prefixes and are ranked with BM25.
+"""
+import asyncio
+import bisect
+import heapq
+import math
+import re
+import time
+from collections import OrderedDict, defaultdict
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+GUESTBOOK_FIELDS = ("name", "relationship", "message")
+RSVP_FIELDS = ("guest_name", "special_message", "dietary_restrictions")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Exact term matches rank above prefix expansions
+PREFIX_WEIGHT = 0.7
+MAX_PREFIX_EXPANSION = 64
+
+def tokenize(text: str) -> list:
+    return TOKEN_RE.findall(str(text or "").lower())
+
+class WeddingSearchIndex:
+    """Inverted index for a single wedding"""
+
+    def __init__(self):
+        self.docs = {}
+        self.postings = defaultdict(dict)
+        self.terms = []
+        self.total_length = 0
+        self.guestbook_mark = ""
+        self.rsvp_mark = ""
+        self.checked_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def add(self, kind: str, doc: dict):
+        key = (kind, doc.get("id"))
+        if key[1] is None or key in self.docs:
+            return
+        fields = GUESTBOOK_FIELDS if kind == "guestbook" else RSVP_FIELDS
+        tokens = [token for field in fields for token in tokenize(doc.get(field))]
+        counts = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        for term, count in counts.items():
+            if term not in self.postings:
+                bisect.insort(self.terms, term)
+            self.postings[term][key] = count
+
+        display = {field: doc.get(field, "") for field in fields}
+        if kind == "guestbook":
+            display["created_at"] = doc.get("created_at")
+            self.guestbook_mark = max(self.guestbook_mark, str(doc.get("created_at") or ""))
+        else:
+            display["attendance"] = doc.get("attendance")
+            display["submitted_at"] = doc.get("submitted_at")
+            self.rsvp_mark = max(self.rsvp_mark, str(doc.get("submitted_at") or ""))
+        self.docs[key] = (len(tokens), display)
+        self.total_length += len(tokens)
+
+    def _expand(self, token: str) -> list:
+        """Index terms matching token exactly or as a prefix, with their weights"""
+        start = bisect.bisect_left(self.terms, token)
+        matches = []
+        for term in self.terms[start:start + MAX_PREFIX_EXPANSION]:
+            if not term.startswith(token):
+                break
+            matches.append((term, 1.0 if term == token else PREFIX_WEIGHT))
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> list:
+        tokens = tokenize(query)
+        if not tokens or not self.docs:
+            return []
+        doc_count = len(self.docs)
+        avg_length = self.total_length / doc_count or 1.0
+
+        scores = defaultdict(float)
+        for token in tokens:
+            for term, weight in self._expand(token):
+                postings = self.postings[term]
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    length = self.docs[key][0]
+                    norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+                    scores[key] += weight * idf * norm
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {"type": kind, "id": doc_id, "score": round(score, 4), **self.docs[(kind, doc_id)][1]}
+            for (kind, doc_id), score in top
+        ]
+
+class SearchIndexRegistry:
+    """LRU of per-wedding indexes, loaded lazily and refreshed incrementally"""
+
+    def __init__(self, max_weddings: int = 200, refresh_interval: float = 2.0):
+        self.max_weddings = max_weddings
+        self.refresh_interval = refresh_interval
+        self._indexes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def add_guestbook_message(self, message: dict):
+        index = self._indexes.get(message.get("wedding_id"))
+        if index is not None:
+            index.add("guestbook", message)
+
+    def add_rsvp(self, rsvp: dict):
+        index = self._indexes.get(rsvp.get("wedding_id"))
+        if index is not None:
+            index.add("rsvp", rsvp)
+
+    async def get(self, wedding_id: str, database) -> WeddingSearchIndex:
+        """Return a current index for wedding_id, building or catching it up as needed"""
+        index = self._indexes.get(wedding_id)
+        if index is None:
+            self.misses += 1
+            index = WeddingSearchIndex()
+            self._indexes[wedding_id] = index
+            while len(self._indexes) > self.max_weddings:
+                self._indexes.popitem(last=False)
+        else:
+            self.hits += 1
+        self._indexes.move_to_end(wedding_id)
+
+        async with index.lock:
+            if time.monotonic() - index.checked_at >= self.refresh_interval:
+                await self._catch_up(index, wedding_id, database)
+                index.checked_at = time.monotonic()
+        return index
+
+    async def _catch_up(self, index: WeddingSearchIndex, wedding_id: str, database):
+        guestbook_query = {"wedding_id": wedding_id}
+        if index.guestbook_mark:
+            guestbook_query["created_at"] = {"$gte": index.guestbook_mark}
+        projection = {field: 1 for field in GUESTBOOK_FIELDS + ("id", "created_at")}
+        projection["_id"] = 0
+        async for message in database.guestbook.find(guestbook_query, projection).batch_size(1000):
+            index.add("guestbook", message)
+
+        rsvp_query = {"wedding_id": wedding_id}
+        if index.rsvp_mark:
+            rsvp_query["submitted_at"] = {"$gte": index.rsvp_mark}
+        projection = {field: 1 for field in RSVP_FIELDS + ("id", "attendance", "submitted_at")}
+        projection["_id"] = 0
+        async for rsvp in database.rsvps.find(rsvp_query, projection).batch_size(1000):
+            index.add("rsvp", rsvp)
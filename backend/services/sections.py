@@ -0,0 +1,117 @@
+"""
+Section-scoped wedding payloads
+
+Section pages (/{username}/faq, /{username}/gallery, ...) only need a few
+fields of the wedding document. Each section is served from a projection
+of those fields plus a small shared header (names, date, venue, theme) and
+cached per (username, section) with its compressed variants and ETag.
+
+Every wedding write bumps a per-section counter stored in the document
+(section_versions.<section>) for just the sections whose fields changed,
+so editing the FAQ leaves cached gallery, party and schedule entries
+valid. Entries are revalidated against that counter with a one-field read
+at most once per interval, which picks up other workers' writes.
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from services.static_assets import compressed_variants
+
+# Fields every section page renders (navigation, headers); changing one changes every section
+SHELL_FIELDS = (
+    "id", "shareable_id", "couple_name_1", "couple_name_2", "wedding_date", "venue_name", "venue_location", "theme"
+)
+
+SECTION_FIELDS = {
+    "story": ("their_story", "story_timeline", "story_enabled"),
+    "schedule": ("schedule_events", "important_info"),
+    "gallery": ("gallery_photos",),
+    "party": ("bridal_party", "groom_party", "special_roles"),
+    "registry": ("registry_items", "honeymoon_fund"),
+    "faq": ("faqs",),
+    "rsvp": (),
+    "guestbook": ()
+}
+
+VERSIONS_FIELD = "section_versions"
+
+def section_projection(section: str) -> dict:
+    """Mongo projection for one section plus its version counter"""
+    projection = {field: 1 for field in SHELL_FIELDS + SECTION_FIELDS[section]}
+    projection[f"{VERSIONS_FIELD}.{section}"] = 1
+    projection["_id"] = 0
+    return projection
+
+def sections_touched(fields) -> list:
+    """Sections whose payload changes when the given wedding fields change"""
+    fields = set(fields)
+    if fields & set(SHELL_FIELDS):
+        return list(SECTION_FIELDS)
+    return [section for section, section_fields in SECTION_FIELDS.items() if fields & set(section_fields)]
+
+def section_version_bump(fields) -> dict:
+    """$inc document advancing the version of every section the fields belong to"""
+    return {f"{VERSIONS_FIELD}.{section}": 1 for section in sections_touched(fields)}
+
+def section_version(wedding: Optional[dict], section: str) -> int:
+    return ((wedding or {}).get(VERSIONS_FIELD) or {}).get(section, 0)
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+class SectionPayload:
+    """One encoded section response and the section version it was built from"""
+
+    __slots__ = ("wedding_id", "version", "body", "variants", "etag", "checked_at")
+
+    def __init__(self, wedding_id: str, version: int, body: bytes):
+        self.wedding_id = wedding_id
+        self.version = version
+        self.body = body
+        self.variants = compressed_variants(body)
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.checked_at = time.monotonic()
+
+def build_section_payload(wedding: dict, section: str, username: str) -> bytes:
+    """JSON body for a section: the shell fields, the section's fields and route metadata"""
+    payload = {field: wedding[field] for field in SHELL_FIELDS + SECTION_FIELDS[section] if field in wedding}
+    payload["current_section"] = section
+    payload["username"] = username
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+class SectionCache:
+    """LRU of encoded section payloads keyed by (username, section)"""
+
+    def __init__(self, max_entries: int = 2000, revalidate_interval: float = 5.0):
+        self.max_entries = max_entries
+        self.revalidate_interval = revalidate_interval
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str, section: str) -> Optional[SectionPayload]:
+        entry = self._entries.get((username, section))
+        if entry is not None:
+            self._entries.move_to_end((username, section))
+        return entry
+
+    def needs_revalidation(self, entry: SectionPayload) -> bool:
+        return time.monotonic() - entry.checked_at >= self.revalidate_interval
+
+    def put(self, username: str, section: str, entry: SectionPayload):
+        self._entries[(username, section)] = entry
+        self._entries.move_to_end((username, section))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, wedding_id: str, sections=None):
+        """Drop cached sections of wedding_id (all of them when sections is None)"""
+        for key in [
+            key for key, entry in self._entries.items()
+            if entry.wedding_id == wedding_id and (sections is None or key[1] in sections)
+        ]:
+            del self._entries[key]
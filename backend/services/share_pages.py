@@ -0,0 +1,123 @@
+"""
+Pre-rendered share-link pages
+
+A shared wedding link (/share/{shareable_id}) is answered with the app's
+index.html already carrying the wedding's Open Graph / Twitter tags and its
+public data inlined as JSON, so link unfurlers get a title, description and
+image without running JavaScript, and browsers render without a follow-up
+API call. Rendered pages (with their compressed variants) are cached per
+shareable_id together with the wedding's updated_at: writes in this worker
+invalidate immediately, and entries are revalidated against updated_at with
+a one-field read at most once per interval to pick up other workers' writes.
+og:url is built from PUBLIC_BASE_URL; without it the URL comes from the
+client's Host header, so the cache is then keyed per host as well.
+"""
+import hashlib
+import html
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from services.static_assets import compressed_variants
+
+INITIAL_DATA_GLOBAL = "__INITIAL_WEDDING__"
+
+_TITLE_RE = re.compile(r"<title>.*?</title>", re.IGNORECASE | re.DOTALL)
+_DESCRIPTION_RE = re.compile(r'<meta\s+name="description"[^>]*>', re.IGNORECASE)
+# Characters that could end the inline <script> or break it as JS
+_SCRIPT_ESCAPES = (("<", "\\u003c"), (">", "\\u003e"), ("&", "\\u0026"), ("\u2028", "\\u2028"), ("\u2029", "\\u2029"))
+
+class SharePage:
+    """One rendered page and the wedding version it was rendered from (precompresses; build it off the event loop)"""
+
+    __slots__ = ("wedding_id", "updated_at", "body", "variants", "etag", "checked_at")
+
+    def __init__(self, wedding_id: str, updated_at: str, body: bytes):
+        self.wedding_id = wedding_id
+        self.updated_at = updated_at
+        self.body = body
+        self.variants = compressed_variants(body)
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.checked_at = time.monotonic()
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _first_image(value) -> Optional[str]:
+    """First http(s) URL found in a (possibly nested) gallery structure"""
+    if isinstance(value, str):
+        return value if value.startswith(("http://", "https://")) else None
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            found = _first_image(item)
+            if found:
+                return found
+    return None
+
+def render_share_page(index_html: str, wedding: dict, page_url: str) -> str:
+    """index.html with social meta tags and the wedding's public data embedded"""
+    couple = " & ".join(name for name in (wedding.get("couple_name_1"), wedding.get("couple_name_2")) if name)
+    title = f"{couple} are getting married" if couple else "You're invited"
+    details = [part for part in (wedding.get("wedding_date"), wedding.get("venue_name"), wedding.get("venue_location")) if part]
+    description = " · ".join(details) or "Join us to celebrate our wedding"
+    image = _first_image(wedding.get("gallery_photos")) or _first_image(wedding.get("story_timeline"))
+
+    tags = [
+        f'<meta name="description" content="{html.escape(description)}" />',
+        '<meta property="og:type" content="website" />',
+        f'<meta property="og:title" content="{html.escape(title)}" />',
+        f'<meta property="og:description" content="{html.escape(description)}" />',
+        f'<meta property="og:url" content="{html.escape(page_url)}" />',
+        f'<meta name="twitter:card" content="{"summary_large_image" if image else "summary"}" />',
+        f'<meta name="twitter:title" content="{html.escape(title)}" />',
+        f'<meta name="twitter:description" content="{html.escape(description)}" />'
+    ]
+    if image:
+        tags.append(f'<meta property="og:image" content="{html.escape(image)}" />')
+        tags.append(f'<meta name="twitter:image" content="{html.escape(image)}" />')
+
+    data = json.dumps(wedding, default=_json_default, separators=(",", ":"))
+    # str.replace scans in C; much faster than per-character mapping on megabyte payloads
+    for char, escape in _SCRIPT_ESCAPES:
+        data = data.replace(char, escape)
+    tags.append(f"<script>window.{INITIAL_DATA_GLOBAL}={data};</script>")
+
+    page = _DESCRIPTION_RE.sub("", index_html, count=1)
+    page = _TITLE_RE.sub(lambda _: f"<title>{html.escape(title)}</title>", page, count=1)
+    return page.replace("</head>", "\n".join(tags) + "</head>", 1)
+
+class SharePageCache:
+    """LRU of rendered share pages keyed by shareable_id (or host/shareable_id)"""
+
+    def __init__(self, max_entries: int = 1000, revalidate_interval: float = 60.0):
+        self.max_entries = max_entries
+        self.revalidate_interval = revalidate_interval
+        self._pages = OrderedDict()
+        # Requests answered from a cached page vs. ones that had to render
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[SharePage]:
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+        return page
+
+    def needs_revalidation(self, page: SharePage) -> bool:
+        return time.monotonic() - page.checked_at >= self.revalidate_interval
+
+    def put(self, key: str, page: SharePage):
+        self._pages[key] = page
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_entries:
+            self._pages.popitem(last=False)
+
+    def invalidate(self, wedding_id: str):
+        """Drop every cached page rendered from wedding_id"""
+        for key in [key for key, page in self._pages.items() if page.wedding_id == wedding_id]:
+            del self._pages[key]
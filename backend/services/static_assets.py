@@ -0,0 +1,175 @@
+"""
+In-memory manifest of the frontend build
+
+The build directory is scanned once at startup. Every file gets its size,
+mtime, content type, ETag and cache policy recorded; compressible files
+get gzip (and, when the optional ``brotli`` package is installed, Brotli)
+variants built up front, and small files keep their bytes in memory. A
+request is then a dict lookup: no stat() or open() per hit, conditional
+requests answered with 304, and the smallest acceptable encoding chosen
+from Accept-Encoding. Content-hashed bundles under static/ are cached by
+browsers as immutable; everything else is revalidated via its ETag.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+
+from fastapi.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are optional; gzip is always built
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/javascript", "application/json", "application/manifest+json",
+    "application/xml", "image/svg+xml", "image/x-icon", "image/vnd.microsoft.icon"
+)
+
+class StaticAsset:
+    """One file from the build, with its precomputed headers and variants"""
+
+    __slots__ = ("path", "stat", "media_type", "etag", "cache_control", "last_modified", "body", "variants")
+
+    def __init__(self, path: Path, stat: os.stat_result, media_type: str, etag: str, cache_control: str):
+        self.path = path
+        self.stat = stat
+        self.media_type = media_type
+        self.etag = etag
+        self.cache_control = cache_control
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.body = None
+        # encoding -> compressed bytes, only kept when smaller than the original
+        self.variants = {}
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Content codings the client accepts (q > 0)"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+    if "*" in accepted:
+        accepted.update(("br", "gzip"))
+    return accepted
+
+def compressed_variants(data: bytes) -> dict:
+    """gzip (and Brotli, if available) encodings of data that are actually smaller"""
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+def negotiated_response(body: Optional[bytes], variants: dict, etag: str, media_type: str, cache_control: str,
+                        accept_encoding: str = "", if_none_match: str = "", extra_headers: dict = None,
+                        path: Path = None, stat: os.stat_result = None) -> Response:
+    """Pick the best encoding for the client and answer conditionally; falls back to path when body is None"""
+    encoding = None
+    if variants:
+        accepted = accepted_encodings(accept_encoding)
+        encoding = next((coding for coding in ("br", "gzip") if coding in accepted and coding in variants), None)
+
+    # Each representation gets its own validator
+    etag = etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control, **(extra_headers or {})}
+    if variants:
+        headers["Vary"] = "Accept-Encoding"
+
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        return Response(variants[encoding], media_type=media_type, headers=headers)
+    if body is not None:
+        return Response(body, media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in if_none_match.split(","))
+
+class StaticManifest:
+    """Path -> StaticAsset index of a build directory"""
+
+    def __init__(self, root: Path, memory_max_bytes: int = 512 * 1024, min_compress_bytes: int = 1024,
+                 immutable_prefix: str = "static/"):
+        self.root = root
+        self.memory_max_bytes = memory_max_bytes
+        self.min_compress_bytes = min_compress_bytes
+        self.immutable_prefix = immutable_prefix
+        self.assets = {}
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(
+            len(asset.body or b"") + sum(len(body) for body in asset.variants.values())
+            for asset in self.assets.values()
+        )
+
+    def build(self) -> int:
+        """Scan the build directory; returns the number of files indexed"""
+        assets = {}
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(directory) / filename
+                relative = path.relative_to(self.root).as_posix()
+                assets[relative] = self._load(path, relative)
+        self.assets = assets
+        return len(assets)
+
+    def _load(self, path: Path, relative: str) -> StaticAsset:
+        stat = path.stat()
+        media_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+        compressible = media_type.startswith(COMPRESSIBLE_TYPES) and stat.st_size >= self.min_compress_bytes
+        cache_control = IMMUTABLE_CACHE_CONTROL if relative.startswith(self.immutable_prefix) else REVALIDATE_CACHE_CONTROL
+
+        if stat.st_size > self.memory_max_bytes and not compressible:
+            # Large binary (images, fonts): served from disk with a stat-based tag
+            etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            return StaticAsset(path, stat, media_type, etag, cache_control)
+
+        data = path.read_bytes()
+        etag = f'"{hashlib.sha1(data).hexdigest()[:20]}"'
+        asset = StaticAsset(path, stat, media_type, etag, cache_control)
+        if stat.st_size <= self.memory_max_bytes:
+            asset.body = data
+        if compressible:
+            asset.variants = compressed_variants(data)
+        return asset
+
+    def get(self, relative: str) -> Optional[StaticAsset]:
+        return self.assets.get(relative)
+
+    def response(self, asset: StaticAsset, accept_encoding: str = "", if_none_match: str = "") -> Response:
+        """Build the response for asset, negotiating encoding and honoring If-None-Match"""
+        return negotiated_response(
+            asset.body, asset.variants, asset.etag, asset.media_type, asset.cache_control,
+            accept_encoding=accept_encoding,
+            if_none_match=if_none_match,
+            extra_headers={"Last-Modified": asset.last_modified},
+            path=asset.path,
+            stat=asset.stat
+        )
@@ -0,0 +1,239 @@
+"""
+Lightweight per-request tracing
+
+TracingMiddleware opens a trace for every HTTP request; code inside the
+request records spans into it through a context variable:
+
+    with span("json.load", "file", path=str(filename)):
+        ...
+
+MongoDB commands (via a pymongo CommandListener), Stripe HTTP calls, JSON
+backup file reads/writes and response serialization are instrumented.
+Requests slower than SLOW_REQUEST_MS are logged with their span breakdown
+on the "server.slow" logger. When OTLP_TRACE_FILE is set, traces are also
+written there as OTLP/JSON (one ExportTraceServiceRequest per line) by a
+background thread, so they can be loaded into any OTLP-compatible viewer
+without a collector or network access.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.responses import JSONResponse
+from pymongo import monitoring
+
+logger = logging.getLogger("server.slow")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# OTLP SpanKind per span category (anything else is INTERNAL = 1)
+SPAN_KINDS = {"server": 2, "mongodb": 3, "http": 3}
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, name: str, kind: str, parent_id, attributes: dict):
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+class Trace:
+    """All spans recorded while handling one request"""
+
+    __slots__ = ("trace_id", "root", "spans")
+
+    def __init__(self, name: str, attributes: dict):
+        self.trace_id = random.getrandbits(128)
+        self.root = Span(name, "server", None, attributes)
+        self.spans = []
+
+    def start_span(self, name: str, kind: str, parent_id, attributes: dict) -> Span:
+        recorded = Span(name, kind, parent_id or self.root.span_id, attributes)
+        # list.append is atomic, so Mongo listener threads can record safely
+        self.spans.append(recorded)
+        return recorded
+
+    def breakdown(self) -> dict:
+        """Time per span kind plus the slowest individual spans"""
+        totals = {}
+        for recorded in self.spans:
+            totals[recorded.kind] = round(totals.get(recorded.kind, 0.0) + recorded.duration_ms, 2)
+        slowest = sorted(self.spans, key=lambda recorded: recorded.duration_ms, reverse=True)[:10]
+        return {
+            "by_kind_ms": totals,
+            "spans": [
+                {"name": recorded.name, "kind": recorded.kind, "ms": round(recorded.duration_ms, 2), **recorded.attributes}
+                for recorded in slowest
+            ]
+        }
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Record a span in the current request's trace (no-op outside a request)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.start_span(name, kind, _current_span.get(), attributes)
+    token = _current_span.set(current.span_id)
+    try:
+        yield current
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+class TracedJSONResponse(JSONResponse):
+    """JSONResponse whose body encoding shows up as a 'serialize' span"""
+
+    def render(self, content) -> bytes:
+        with span("json.render", "serialize"):
+            return super().render(content)
+
+class MongoTracingListener(monitoring.CommandListener):
+    """Adds a span for every MongoDB command issued inside a traced request"""
+
+    def __init__(self):
+        self._spans = {}
+
+    def started(self, event):
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        self._spans[(event.connection_id, event.request_id)] = trace.start_span(
+            f"mongodb.{event.command_name}", "mongodb", _current_span.get(),
+            {"collection": target if isinstance(target, str) else ""}
+        )
+
+    def succeeded(self, event):
+        recorded = self._spans.pop((event.connection_id, event.request_id), None)
+        if recorded is not None:
+            recorded.end_ns = recorded.start_ns + event.duration_micros * 1000
+
+    def failed(self, event):
+        recorded = self._spans.pop((event.connection_id, event.request_id), None)
+        if recorded is not None:
+            recorded.end_ns = recorded.start_ns + event.duration_micros * 1000
+            recorded.attributes["error"] = str(event.failure.get("errmsg", ""))[:200]
+
+class OtlpFileExporter:
+    """Appends traces to a file as OTLP/JSON lines from a background thread"""
+
+    def __init__(self, path: str, service_name: str = "wedding-card-api"):
+        self.path = path
+        self.service_name = service_name
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="otlp-file-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace):
+        self._queue.put(trace)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as output:
+            while True:
+                trace = self._queue.get()
+                output.write(json.dumps(self._encode(trace), separators=(",", ":")) + "\n")
+                if self._queue.empty():
+                    output.flush()
+
+    def _encode(self, trace: Trace) -> dict:
+        trace_id = f"{trace.trace_id:032x}"
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "wedding-card.tracing"},
+                "spans": [self._encode_span(trace_id, recorded) for recorded in [trace.root, *trace.spans]]
+            }]
+        }]}
+
+    @staticmethod
+    def _encode_span(trace_id: str, recorded: Span) -> dict:
+        encoded = {
+            "traceId": trace_id,
+            "spanId": f"{recorded.span_id:016x}",
+            "name": recorded.name,
+            "kind": SPAN_KINDS.get(recorded.kind, 1),
+            "startTimeUnixNano": str(recorded.start_ns),
+            "endTimeUnixNano": str(recorded.end_ns or recorded.start_ns),
+            "attributes": [
+                {"key": "span.category", "value": {"stringValue": recorded.kind}},
+                *({"key": key, "value": {"stringValue": str(value)}} for key, value in recorded.attributes.items())
+            ]
+        }
+        if recorded.parent_id is not None:
+            encoded["parentSpanId"] = f"{recorded.parent_id:016x}"
+        return encoded
+
+class TracingMiddleware:
+    """Opens a trace per HTTP request; logs slow requests and feeds the optional exporter"""
+
+    def __init__(self, app, slow_request_ms: float = 500.0, exporter: OtlpFileExporter = None,
+                 export_sample_rate: float = 1.0):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.exporter = exporter
+        self.export_sample_rate = export_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        trace = Trace(f"{scope['method']} {scope['path']}", {"http.method": scope["method"], "http.target": scope["path"]})
+        token = _current_trace.set(trace)
+        status_code = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            trace.root.end_ns = time.time_ns()
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                trace.root.name = f"{scope['method']} {route}"
+                trace.root.attributes["http.route"] = route
+            trace.root.attributes["http.status_code"] = status_code
+            # Long-lived event streams are slow by design; don't report them
+            if not streaming:
+                self._report(trace, status_code)
+
+    def _report(self, trace: Trace, status_code: int):
+        duration_ms = trace.root.duration_ms
+        if duration_ms >= self.slow_request_ms:
+            logger.warning(
+                f"Slow request: {trace.root.name} took {duration_ms:.0f} ms",
+                extra={"duration_ms": round(duration_ms, 2), "status": status_code, **trace.breakdown()}
+            )
+        if self.exporter is not None and random.random() < self.export_sample_rate:
+            self.exporter.export(trace)
+
+def exporter_from_env():
+    """OtlpFileExporter for OTLP_TRACE_FILE, or None when unset"""
+    path = os.getenv("OTLP_TRACE_FILE")
+    return OtlpFileExporter(path) if path else None
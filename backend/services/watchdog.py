@@ -0,0 +1,159 @@
+"""
+Event loop blocking detector
+
+An opt-in watchdog for load tests and canaries. A heartbeat task on the
+event loop records when the loop last got around to running it. A
+watchdog thread checks that timestamp: if the loop has not come back for
+longer than the threshold, it is stuck in one callback, and the thread
+captures the loop thread's stack right then (sys._current_frames), while
+the offending code is still on it. Once the loop recovers, the heartbeat
+measures how long the stall lasted and reports it:
+
+  * log: a WARNING on "server.loop" with the route, request id, duration
+    and the captured stack
+  * metrics: event_loop_blocked_total and event_loop_blocked_seconds by route
+
+Requests are attributed through LoopWatchdogMiddleware, which maps each
+request's asyncio task to its ASGI scope in a WeakKeyDictionary (the
+router stores the matched route in that scope).
+
+    LOOP_WATCHDOG_MS=100    # enable; report callbacks holding the loop >= 100 ms
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+from config.logging_config import request_id_var
+from services.metrics import MetricsRegistry, registry
+
+logger = logging.getLogger("server.loop")
+
+MAX_STACK_FRAMES = 30
+
+class LoopWatchdog:
+    """Reports callbacks that hold the event loop longer than threshold seconds"""
+
+    def __init__(self, threshold: float, metrics: MetricsRegistry = registry):
+        self.threshold = threshold
+        # Poll often enough to catch a stall while it is still in progress
+        self.interval = max(threshold / 4, 0.005)
+        self.blocked = metrics.counter(
+            "event_loop_blocked_total", "Callbacks that held the event loop past the watchdog threshold", ("route",)
+        )
+        self.blocked_duration = metrics.histogram(
+            "event_loop_blocked_seconds", "How long blocking callbacks held the event loop", ("route",),
+            buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+        )
+        # request task -> (ASGI scope, request id)
+        self.requests = weakref.WeakKeyDictionary()
+        self._loop = None
+        self._loop_thread = None
+        self._beat = 0.0
+        self._stall = None
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.to_thread(self._thread.join)
+        self._task = self._thread = None
+
+    def track(self, scope: dict):
+        """Attribute anything the current task blocks on to this request"""
+        task = asyncio.current_task()
+        if task is not None:
+            self.requests[task] = (scope, request_id_var.get())
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            stall = self._stall
+            if stall is not None:
+                self._stall = None
+                self._report(stall, now - stall["since"] - self.interval)
+            self._beat = now
+
+    def _watch(self):
+        while not self._stopping.wait(self.interval):
+            beat = self._beat
+            if self._stall is not None or time.perf_counter() - beat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)[-MAX_STACK_FRAMES:]
+            try:
+                task = asyncio.current_task(self._loop)
+            except RuntimeError:
+                task = None
+            # The heartbeat may have run while we were capturing; then there is no stall
+            if beat == self._beat:
+                self._stall = {
+                    "since": beat,
+                    "stack": [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in stack],
+                    "task": task.get_name() if task is not None else None,
+                    "request": self.requests.get(task) if task is not None else None
+                }
+
+    def _report(self, stall: dict, duration: float):
+        route, request_id, path = "background", None, None
+        if stall["request"] is not None:
+            scope, request_id = stall["request"]
+            path = scope.get("path")
+            template = getattr(scope.get("route"), "path", None) or "unmatched"
+            route = f"{scope.get('method', '')} {template}".strip()
+        self.blocked.inc(route)
+        self.blocked_duration.observe(duration, route)
+        logger.warning(
+            f"Event loop blocked for {duration * 1000:.0f} ms in {route}",
+            extra={
+                "duration_ms": round(duration * 1000, 2),
+                "route": route,
+                "path": path,
+                "blocked_request_id": request_id,
+                "task": stall["task"],
+                "stack": stall["stack"]
+            }
+        )
+
+class LoopWatchdogMiddleware:
+    """Registers each HTTP request's task with the watchdog for route attribution"""
+
+    def __init__(self, app, watchdog: LoopWatchdog):
+        self.app = app
+        self.watchdog = watchdog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.watchdog.track(scope)
+        await self.app(scope, receive, send)
+
+def watchdog_from_env():
+    """LoopWatchdog for LOOP_WATCHDOG_MS, or None when unset/0"""
+    threshold_ms = float(os.getenv("LOOP_WATCHDOG_MS", "0") or 0)
+    return LoopWatchdog(threshold_ms / 1000) if threshold_ms > 0 else None
@@ -0,0 +1,138 @@
+"""
+Minimal offline stand-in for the Stripe PaymentIntents API
+
+Run it and point the backend at it to load-test payment routes without
+network access or a Stripe account:
+
+    python tools/fake_stripe.py --port 12111 --latency-ms 150 --succeed
+    STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_fake uvicorn server:app
+
+Supports POST /v1/payment_intents (honouring Idempotency-Key),
+GET /v1/payment_intents/{id} and POST /v1/payment_intents/{id}/confirm.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+class FakeStripeState:
+    def __init__(self, latency: float, succeed: bool, error_rate: float):
+        self.latency = latency
+        self.succeed = succeed
+        self.error_rate = error_rate
+        self.intents = {}
+        self.idempotency = {}
+        self.lock = threading.Lock()
+
+    def create_intent(self, form: dict, idempotency_key: str) -> dict:
+        with self.lock:
+            if idempotency_key and idempotency_key in self.idempotency:
+                return self.idempotency[idempotency_key]
+            intent_id = f"pi_fake_{uuid.uuid4().hex[:24]}"
+            amount = int(form.get("amount", 0))
+            intent = {
+                "id": intent_id,
+                "object": "payment_intent",
+                "amount": amount,
+                "amount_received": amount if self.succeed else 0,
+                "currency": form.get("currency", "usd"),
+                "status": "succeeded" if self.succeed else "requires_payment_method",
+                "client_secret": f"{intent_id}_secret_{uuid.uuid4().hex[:16]}",
+                "created": int(time.time()),
+                "livemode": False,
+                "metadata": {k[len("metadata["):-1]: v for k, v in form.items() if k.startswith("metadata[")}
+            }
+            self.intents[intent_id] = intent
+            if idempotency_key:
+                self.idempotency[idempotency_key] = intent
+            return intent
+
+    def confirm_intent(self, intent_id: str) -> dict:
+        with self.lock:
+            intent = self.intents.get(intent_id)
+            if intent:
+                intent["status"] = "succeeded"
+                intent["amount_received"] = intent["amount"]
+            return intent
+
+def make_handler(state: FakeStripeState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, code: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Request-Id", f"req_fake_{uuid.uuid4().hex[:14]}")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _simulate(self) -> bool:
+            if state.latency:
+                time.sleep(state.latency)
+            if state.error_rate and random.random() < state.error_rate:
+                self._send(500, {"error": {"type": "api_error", "message": "Injected fake failure"}})
+                return False
+            return True
+
+        def _not_found(self):
+            self._send(404, {"error": {"type": "invalid_request_error", "message": "No such payment_intent"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            form = dict(parse_qsl(self.rfile.read(length).decode()))
+            if not self._simulate():
+                return
+            parts = self.path.strip("/").split("/")
+            if parts == ["v1", "payment_intents"]:
+                self._send(200, state.create_intent(form, self.headers.get("Idempotency-Key")))
+            elif len(parts) == 4 and parts[:2] == ["v1", "payment_intents"] and parts[3] == "confirm":
+                intent = state.confirm_intent(parts[2])
+                if intent:
+                    self._send(200, intent)
+                else:
+                    self._not_found()
+            else:
+                self._not_found()
+
+        def do_GET(self):
+            if not self._simulate():
+                return
+            parts = self.path.split("?")[0].strip("/").split("/")
+            intent = None
+            if len(parts) == 3 and parts[:2] == ["v1", "payment_intents"]:
+                intent = state.intents.get(parts[2])
+            if intent:
+                self._send(200, intent)
+            else:
+                self._not_found()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Stripe PaymentIntents server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial delay per request")
+    parser.add_argument("--succeed", action="store_true", help="Create intents already succeeded")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    state = FakeStripeState(args.latency_ms / 1000, args.succeed, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Fake Stripe listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Deferred imports for heavy optional subsystems
+"""
+import asyncio
+import importlib
+import threading
+
+class LazyModule:
+    """A module imported on first attribute access instead of at import time"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.name)
+        return self._module
+
+    async def aload(self):
+        """Import off the event loop; the first import can take hundreds of ms"""
+        if self._module is None:
+            await asyncio.to_thread(self.load)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.load(), attribute)
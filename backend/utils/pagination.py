@@ -0,0 +1,43 @@
+"""
+Opaque keyset-pagination cursors
+"""
+import base64
+import json
+from datetime import datetime
+
+def encode_cursor(*values) -> str:
+    """Encode the sort-key values of the last item on a page"""
+    payload = [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor produced by encode_cursor; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, list) or len(payload) != size:
+        raise ValueError("Invalid cursor")
+    return [_decode_value(v) for v in payload]
+
+def _decode_value(value):
+    """A cursor value is a scalar or {"$dt": iso}; anything else (e.g. a Mongo operator) is rejected"""
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, dict) and len(value) == 1 and isinstance(value.get("$dt"), str):
+        try:
+            return datetime.fromisoformat(value["$dt"])
+        except ValueError:
+            pass
+    raise ValueError("Invalid cursor")
+
+def keyset_filter(fields: list, values: list) -> dict:
+    """Mongo filter for items strictly after values in a descending sort on fields"""
+    clauses = []
+    for i, field in enumerate(fields):
+        clause = {fields[j]: values[j] for j in range(i)}
+        clause[field] = {"$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
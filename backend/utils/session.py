@@ -1,12 +1,16 @@
 """
 Session management utilities
 """
+import logging
 import uuid
 from datetime import datetime
 from fastapi import HTTPException, status
-from config.database import get_collections, database
+from config import database as mongo
+from config.database import get_collections
 from models.user import User
 
+logger = logging.getLogger("server.sessions")
+
 # Simple session storage (in production, use Redis or similar)
 active_sessions = {}
 
@@ -26,11 +30,11 @@ async def create_simple_session(user_id: str) -> str:
     users_coll, weddings_coll, _, _ = await get_collections()
     if users_coll is not None:
         try:
-            sessions_collection = database.sessions
+            sessions_collection = mongo.database.sessions
             await sessions_collection.insert_one(session_data)
-            print(f"✅ Session {session_id} stored in MongoDB")
+            logger.debug("Session stored in MongoDB", extra={"user_id": user_id})
         except Exception as e:
-            print(f"⚠️ Failed to store session in MongoDB: {e}")
+            logger.warning(f"Failed to store session in MongoDB: {e}")
     
     return session_id
 
@@ -50,15 +54,15 @@ async def get_current_user_simple(session_id: str = None):
         try:
             users_coll, weddings_coll, _, _ = await get_collections()
             if users_coll is not None:
-                sessions_collection = database.sessions
+                sessions_collection = mongo.database.sessions
                 session_data = await sessions_collection.find_one({"session_id": session_id})
                 if session_data:
                     # Restore to memory cache
                     active_sessions[session_id] = session_data
                     session = session_data
-                    print(f"✅ Session {session_id} restored from MongoDB")
+                    logger.debug("Session restored from MongoDB", extra={"user_id": session_data.get("user_id")})
         except Exception as e:
-            print(f"⚠️ Failed to restore session from MongoDB: {e}")
+            logger.warning(f"Failed to restore session from MongoDB: {e}")
     
     if not session:
         raise HTTPException(
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { X, Gift, CreditCard, Smartphone, Globe, Heart } from 'lucide-react';
 import { loadStripe } from '@stripe/stripe-js';
 import { Elements, CardElement, useStripe, useElements } from '@stripe/react-stripe-js';
@@ -26,14 +26,24 @@ const PaymentForm = ({
   const [paymentError, setPaymentError] = useState(null);
   const [paymentMethod, setPaymentMethod] = useState('card'); // 'card' or 'upi'
   const [showUpiDetails, setShowUpiDetails] = useState(false);
+  // One key per contribution attempt, so resubmits and retries are deduplicated server-side
+  const attemptKey = useRef(null);
   const { themes, currentTheme } = useAppTheme();
   const theme = themes[currentTheme];
 
+  // A key is bound to the request body it was first sent with; edits start a new attempt
+  useEffect(() => {
+    attemptKey.current = null;
+  }, [amount, contributorName, contributorEmail, contributorPhone, message, paymentMethod]);
+
   const handleSubmit = async (event) => {
     event.preventDefault();
 
     setProcessing(true);
     setPaymentError(null);
+    if (!attemptKey.current) {
+      attemptKey.current = `${Date.now()}-${Math.random().toString(36).substr(2, 9)}`;
+    }
 
     try {
       if (paymentMethod === 'card') {
@@ -49,6 +59,7 @@ const PaymentForm = ({
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
+            'Idempotency-Key': attemptKey.current,
           },
           body: JSON.stringify({
             wedding_id: weddingId,
@@ -61,7 +72,12 @@ const PaymentForm = ({
           }),
         });
 
-        const { client_secret, payment_intent_id } = await response.json();
+        const intentData = await response.json();
+        if (!response.ok) {
+          // Validation errors (422) carry a list of problems rather than a message
+          throw new Error(typeof intentData.detail === 'string' ? intentData.detail : 'Failed to start the payment');
+        }
+        const { client_secret, payment_intent_id } = intentData;
 
         // Confirm payment
         const { error, paymentIntent } = await stripe.confirmCardPayment(
@@ -79,6 +95,8 @@ const PaymentForm = ({
         );
 
         if (error) {
+          // A declined card is retried as a new attempt
+          attemptKey.current = null;
           setPaymentError(error.message);
           onError(error.message);
         } else if (paymentIntent.status === 'succeeded') {
@@ -93,6 +111,7 @@ const PaymentForm = ({
             }),
           });
 
+          attemptKey.current = null;
           onSuccess({
             amount: paymentIntent.amount_received / 100,
             currency: paymentIntent.currency,
@@ -105,6 +124,7 @@ const PaymentForm = ({
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
+            'Idempotency-Key': attemptKey.current,
           },
           body: JSON.stringify({
             wedding_id: weddingId,
@@ -115,11 +135,12 @@ const PaymentForm = ({
             currency: 'inr',
             message: message,
             payment_method: 'upi',
-            upi_reference: `UPI-${Date.now()}-${Math.random().toString(36).substr(2, 9)}`
+            upi_reference: `UPI-${attemptKey.current}`
           }),
         });
 
         if (response.ok) {
+          attemptKey.current = null;
           onSuccess({
             amount: parseFloat(amount),
             currency: 'inr',
@@ -131,6 +152,7 @@ const PaymentForm = ({
         }
       }
     } catch (error) {
+      attemptKey.current = null;
       setPaymentError(error.message);
       onError(error.message);
     }
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Heart, MapPin, Phone, CreditCard, Save, DollarSign, Edit3, Trash2, Plus } from 'lucide-react';
 
-const RegistryAdminContent = ({ initialData, theme, onSave }) => {
+const RegistryAdminContent = ({ initialData, initialContributions, theme, onSave }) => {
   const [honeymoonConfig, setHoneymoonConfig] = useState({
     upi_id: '',
     phone_number: '',
@@ -13,6 +13,10 @@ const RegistryAdminContent = ({ initialData, theme, onSave }) => {
 
   const [contributions, setContributions] = useState([]);
   const [totalAmount, setTotalAmount] = useState(0);
+  // Completed contributions overall; the list is paged, so its length undercounts
+  const [contributionCount, setContributionCount] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(false);
 
   // Initialize from existing data
@@ -27,30 +31,57 @@ const RegistryAdminContent = ({ initialData, theme, onSave }) => {
 
   // Fetch contributions when component mounts
   useEffect(() => {
-    if (initialData?.id) {
+    if (initialContributions) {
+      // Already loaded with the rest of the dashboard
+      applyContributionPage(initialContributions);
+    } else if (initialData?.id) {
       fetchContributions();
     }
-  }, [initialData?.id]);
+  }, [initialData?.id, initialContributions]);
+
+  const applyContributionPage = (data, append = false) => {
+    setContributions(prev => append ? [...prev, ...(data.contributions || [])] : (data.contributions || []));
+    setTotalAmount(data.total_amount || 0);
+    setContributionCount(data.count || 0);
+    setNextCursor(data.next_cursor || null);
+  };
+
+  const contributionsUrl = (cursor) => {
+    const sessionId = localStorage.getItem('session_id');
+    const url = `${process.env.REACT_APP_BACKEND_URL}/api/payment/contributions/${initialData.id}?session_id=${sessionId}`;
+    return cursor ? `${url}&cursor=${encodeURIComponent(cursor)}` : url;
+  };
 
   const fetchContributions = async () => {
     try {
-      const sessionId = localStorage.getItem('session_id');
-      if (!sessionId) return;
+      if (!localStorage.getItem('session_id')) return;
 
-      const response = await fetch(
-        `${process.env.REACT_APP_BACKEND_URL}/api/payment/contributions/${initialData.id}?session_id=${sessionId}`
-      );
+      const response = await fetch(contributionsUrl());
       
       if (response.ok) {
-        const data = await response.json();
-        setContributions(data.contributions || []);
-        setTotalAmount(data.total_amount || 0);
+        applyContributionPage(await response.json());
       }
     } catch (error) {
       console.error('Error fetching contributions:', error);
     }
   };
 
+  const fetchMoreContributions = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+
+    try {
+      const response = await fetch(contributionsUrl(nextCursor));
+      if (response.ok) {
+        applyContributionPage(await response.json(), true);
+      }
+    } catch (error) {
+      console.error('Error fetching more contributions:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleConfigChange = (field, value) => {
     const newConfig = {
       ...honeymoonConfig,
@@ -286,11 +317,11 @@ const RegistryAdminContent = ({ initialData, theme, onSave }) => {
         >
           <h3 className="text-xl font-semibold mb-6 flex items-center gap-2" style={{ color: theme.primary }}>
             <Heart className="w-6 h-6" />
-            Recent Contributions ({contributions.length})
+            Recent Contributions ({contributionCount})
           </h3>
           
           <div className="space-y-4">
-            {contributions.slice(0, 10).map((contribution, index) => (
+            {contributions.map((contribution, index) => (
               <div 
                 key={contribution.id || index}
                 className="flex items-center justify-between p-4 rounded-xl bg-white/10 border border-white/20"
@@ -329,6 +360,19 @@ const RegistryAdminContent = ({ initialData, theme, onSave }) => {
               </div>
             ))}
           </div>
+
+          {nextCursor && (
+            <div className="text-center mt-6">
+              <button
+                onClick={fetchMoreContributions}
+                disabled={loadingMore}
+                className="px-6 py-3 rounded-xl font-semibold transition-all duration-300 hover:shadow-lg disabled:opacity-60"
+                style={{ backgroundColor: theme.accent, color: 'white' }}
+              >
+                {loadingMore ? 'Loading...' : 'Load More Contributions'}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
@@ -75,7 +75,12 @@ export const UserDataProvider = ({ children }) => {
         
         if (response.ok) {
           const data = await response.json();
-          setWeddingData(data);
+          // Section routes return only that section's fields; keep what earlier pages loaded
+          setWeddingData(prev => (
+            currentSection !== 'home' && prev?.username === currentUsername
+              ? { ...prev, ...data }
+              : { ...data, username: currentUsername }
+          ));
         } else {
           console.error('Failed to load wedding data:', response.status);
           setWeddingData(getDefaultWeddingData());
@@ -75,6 +75,18 @@ const DashboardPage = () => {
   const [weddingUrl, setWeddingUrl] = useState('');
   const [copied, setCopied] = useState(false);
   const [autoSaving, setAutoSaving] = useState(false);
+  // RSVPs, guestbook and contributions from one /api/dashboard call
+  const [dashboardData, setDashboardData] = useState(null);
+
+  useEffect(() => {
+    const sessionId = userInfo?.sessionId || localStorage.getItem('session_id');
+    if (!isAuthenticated || !sessionId) return;
+    const backendUrl = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
+    fetch(`${backendUrl}/api/dashboard?session_id=${sessionId}&sections=rsvps,contributions`)
+      .then(response => (response.ok ? response.json() : null))
+      .then(data => data && data.success && setDashboardData(data))
+      .catch(error => console.error('Error loading dashboard:', error));
+  }, [isAuthenticated, userInfo?.sessionId]);
 
   useEffect(() => {
     // Check authentication using centralized context
@@ -540,6 +552,7 @@ const DashboardPage = () => {
           onClose={() => setActiveForm(null)}
           onSubmit={handleFormSubmit}
           initialData={weddingData}
+          dashboardData={dashboardData}
           theme={theme}
           currentTheme={currentTheme}
           setCurrentTheme={setCurrentTheme}
@@ -550,7 +563,7 @@ const DashboardPage = () => {
 };
 
 // Form Popup Component
-const FormPopup = ({ sectionId, onClose, onSubmit, initialData, theme, currentTheme, setCurrentTheme }) => {
+const FormPopup = ({ sectionId, onClose, onSubmit, initialData, dashboardData, theme, currentTheme, setCurrentTheme }) => {
   const [formData, setFormData] = useState({});
   const [hasUnsavedChanges, setHasUnsavedChanges] = useState(false);
 
@@ -697,6 +710,7 @@ const FormPopup = ({ sectionId, onClose, onSubmit, initialData, theme, currentTh
             </h3>
             <RSVPAdminContent 
               weddingData={initialData} 
+              initialRsvps={dashboardData?.rsvps}
               theme={theme} 
             />
           </div>
@@ -746,6 +760,7 @@ const FormPopup = ({ sectionId, onClose, onSubmit, initialData, theme, currentTh
           <div className="space-y-6">
             <RegistryAdminContent 
               initialData={initialData} 
+              initialContributions={dashboardData?.contributions}
               theme={theme} 
               onSave={handleChange} 
             />
@@ -1168,7 +1183,7 @@ const OurStoryFormContent = ({ initialData, theme, onSave }) => {
 };
 
 // RSVP Admin Content Component - Enhanced with Two Sections
-const RSVPAdminContent = ({ weddingData, theme }) => {
+const RSVPAdminContent = ({ weddingData, initialRsvps, theme }) => {
   const [rsvps, setRsvps] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
@@ -1182,11 +1197,40 @@ const RSVPAdminContent = ({ weddingData, theme }) => {
   });
 
   useEffect(() => {
-    fetchRSVPs();
-  }, [weddingData]);
+    // The dashboard payload already has the first page; only fetch without it
+    if (initialRsvps && initialRsvps.summary) {
+      applyRSVPs(initialRsvps.rsvps, initialRsvps.summary);
+      setLoading(false);
+    } else {
+      fetchRSVPs();
+    }
+  }, [weddingData, initialRsvps]);
 
-  const fetchRSVPs = async () => {
-    setLoading(true);
+  // Refresh when the server announces a new RSVP instead of polling
+  useEffect(() => {
+    if (!weddingData?.id || typeof EventSource === 'undefined') return;
+    const backendUrl = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
+    const events = new EventSource(`${backendUrl}/api/events/${weddingData.id}`);
+    const refresh = () => fetchRSVPs({ silent: true });
+    events.addEventListener('rsvp.created', refresh);
+    events.addEventListener('resync', refresh);
+    return () => events.close();
+  }, [weddingData?.id]);
+
+  const applyRSVPs = (rsvpList, summary) => {
+    setRsvps(rsvpList);
+    
+    // Statistics come from the server-maintained summary counters
+    setStats({
+      total: summary.total_responses || 0,
+      attending: summary.attending_count || 0,
+      notAttending: summary.declined_count || 0,
+      totalGuests: summary.attending_guests || 0
+    });
+  };
+
+  const fetchRSVPs = async ({ silent = false } = {}) => {
+    if (!silent) setLoading(true);
     setError('');
     
     try {
@@ -1198,23 +1242,15 @@ const RSVPAdminContent = ({ weddingData, theme }) => {
         return;
       }
       
-      const response = await fetch(`${backendUrl}/api/rsvp/shareable/${weddingId}`);
+      const [response, summaryResponse] = await Promise.all([
+        fetch(`${backendUrl}/api/rsvp/shareable/${weddingId}`),
+        fetch(`${backendUrl}/api/rsvp/summary/${weddingData.id}`)
+      ]);
       const data = await response.json();
+      const summaryData = await summaryResponse.json();
       
       if (data.success) {
-        setRsvps(data.rsvps);
-        
-        // Calculate statistics
-        const attending = data.rsvps.filter(rsvp => rsvp.attendance === 'yes');
-        const notAttending = data.rsvps.filter(rsvp => rsvp.attendance === 'no');
-        const totalGuests = attending.reduce((sum, rsvp) => sum + (rsvp.guest_count || 1), 0);
-        
-        setStats({
-          total: data.rsvps.length,
-          attending: attending.length,
-          notAttending: notAttending.length,
-          totalGuests: totalGuests
-        });
+        applyRSVPs(data.rsvps, summaryData.summary || {});
       } else {
         setError(data.message || 'Failed to fetch RSVPs');
       }
@@ -15,6 +15,8 @@ const GuestbookPage = ({ isPrivate = false, isDashboard = false }) => {
   });
 
   const [messages, setMessages] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
   const [error, setError] = useState('');
@@ -26,29 +28,42 @@ const GuestbookPage = ({ isPrivate = false, isDashboard = false }) => {
     fetchMessages();
   }, [weddingId]);
 
-  const fetchMessages = async () => {
-    setLoading(true);
+  // Live updates: refetch the first page when a new message is announced
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return;
+    const backendUrl = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
+    const events = new EventSource(`${backendUrl}/api/events/${weddingId}`);
+    const refresh = () => fetchMessages({ silent: true });
+    events.addEventListener('guestbook.created', refresh);
+    events.addEventListener('resync', refresh);
+    return () => events.close();
+  }, [weddingId]);
+
+  const getMessagesUrl = () => {
+    const backendUrl = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
+    
+    if (isPrivate && isDashboard) {
+      // Private dashboard guestbook - get messages for user's specific wedding
+      return `${backendUrl}/api/guestbook/private/${weddingId}`;
+    } else if (isPrivate) {
+      // Private wedding page (shareable link) - get messages for specific wedding
+      return `${backendUrl}/api/guestbook/${weddingId}`;
+    }
+    // Public landing page guestbook - get latest public messages
+    return `${backendUrl}/api/guestbook/public/messages`;
+  };
+
+  const fetchMessages = async ({ silent = false } = {}) => {
+    if (!silent) setLoading(true);
     setError('');
     
     try {
-      const backendUrl = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
-      
-      let response;
-      if (isPrivate && isDashboard) {
-        // Private dashboard guestbook - get messages for user's specific wedding
-        response = await fetch(`${backendUrl}/api/guestbook/private/${weddingId}`);
-      } else if (isPrivate) {
-        // Private wedding page (shareable link) - get messages for specific wedding
-        response = await fetch(`${backendUrl}/api/guestbook/${weddingId}`);
-      } else {
-        // Public landing page guestbook - get all public messages
-        response = await fetch(`${backendUrl}/api/guestbook/public/messages`);
-      }
-      
+      const response = await fetch(getMessagesUrl());
       const data = await response.json();
       
       if (data.success) {
         setMessages(data.messages || []);
+        setNextCursor(data.next_cursor || null);
       } else {
         setError('Failed to load messages');
       }
@@ -60,6 +75,25 @@ const GuestbookPage = ({ isPrivate = false, isDashboard = false }) => {
     }
   };
 
+  const fetchMoreMessages = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    
+    try {
+      const response = await fetch(`${getMessagesUrl()}?cursor=${encodeURIComponent(nextCursor)}`);
+      const data = await response.json();
+      
+      if (data.success) {
+        setMessages(prev => [...prev, ...(data.messages || [])]);
+        setNextCursor(data.next_cursor || null);
+      }
+    } catch (err) {
+      console.error('Error fetching more messages:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setSubmitting(true);
@@ -402,6 +436,22 @@ const GuestbookPage = ({ isPrivate = false, isDashboard = false }) => {
               ))
             )}
           </div>
+
+          {!loading && !error && nextCursor && (
+            <div className="text-center mt-8">
+              <button
+                onClick={fetchMoreMessages}
+                disabled={loadingMore}
+                className="px-6 py-3 rounded-xl font-semibold transition-all duration-300 hover:scale-105 disabled:opacity-60"
+                style={{
+                  background: theme.gradientAccent,
+                  color: theme.primary
+                }}
+              >
+                {loadingMore ? 'Loading...' : 'Load More Messages'}
+              </button>
+            </div>
+          )}
         </div>
 
         {/* Thank You Note */}
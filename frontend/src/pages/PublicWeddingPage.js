@@ -85,7 +85,14 @@ const PublicWeddingPage = () => {
       
       // Determine which identifier to use (prioritize shareableId)
       const identifier = shareableId || weddingId;
-      
+
+      // Share links are pre-rendered by the backend with the wedding data inlined
+      const initialWedding = window.__INITIAL_WEDDING__;
+      if (shareableId && initialWedding && initialWedding.shareable_id === shareableId) {
+        setWeddingData(initialWedding);
+        return;
+      }
+
       if (identifier) {
         try {
           // Use REACT_APP_BACKEND_URL environment variable or fallback to localhost:8001